@@ -2,11 +2,17 @@
 services/cache_service.py — Armazém Inteligente
 Equivalente ao advancedCacheService.ts.
 Cache de dois níveis: L1 (memória) + L2 (disco via diskcache).
+L3 opcional (Redis) para compartilhar chaves quentes entre processos.
 """
 import hashlib
 import json
+import os
+import threading
 import time
-from typing import Any, Optional
+import warnings
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Optional
 from functools import lru_cache
 
 try:
@@ -15,107 +21,532 @@ try:
 except ImportError:
     HAS_DISKCACHE = False
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+
+def _freeze(value: Any) -> Any:
+    """
+    Converte dicts/listas em tuplas ordenadas (hasheáveis) para memoização.
+    Cada valor leva o nome do tipo: o lru_cache compara por ==/hash, e sem
+    isso 1, True e 1.0 cairiam na mesma entrada (chave dependente da ordem).
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), type(v).__name__, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple((type(v).__name__, _freeze(v)) for v in value)
+    return value
+
+
+_PRIMITIVOS = (str, int, float, bool, type(None))
+
+
+# Params de chave devem conter só campos de identidade (empresa, cnpj...).
+# Acima disso, provavelmente alguém passou o resultado inteiro como chave.
+_MAX_KEY_PAYLOAD = 4096
+
+
+if HAS_ORJSON:
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(
+            obj, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        )
+else:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, sort_keys=True, default=str).encode()
+
+
+def _dumps_key(obj: Any) -> bytes:
+    """
+    Serialização determinística (bytes) para compor chaves de cache.
+    Avisa quando o payload passa de _MAX_KEY_PAYLOAD bytes: serializar
+    estruturas grandes (ex.: um DossieCompleto) a cada lookup é O(N).
+    """
+    data = _dumps(obj)
+    if len(data) > _MAX_KEY_PAYLOAD:
+        warnings.warn(
+            f"Payload de chave de cache grande ({len(data)} bytes); "
+            "passe apenas campos de identidade",
+            stacklevel=3,
+        )
+    return data
+
+
+def _hash_params(h, items: tuple):
+    """
+    Alimenta o hasher com trios (chave, tipo, valor) já ordenados, sem montar
+    uma string intermediária. Dicts planos de primitivos (o caso comum)
+    evitam o json.dumps.
+    """
+    # repr já distingue 1/True/1.0: o hash dos primitivos não precisa do tipo.
+    # A chave também vai por repr (entre aspas): sem isso {"a=1|b": 2} e
+    # {"a": 1, "b": 2} produziriam os mesmos bytes.
+    if all(isinstance(v, _PRIMITIVOS) for _, _, v in items):
+        for k, _, v in items:
+            h.update(repr(k).encode())
+            h.update(b'=')
+            h.update(repr(v).encode())
+            h.update(b'|')
+    else:
+        h.update(_dumps_key(items))
+
+
+# namespace → b"namespace:" (namespaces são poucas constantes)
+_NS_BYTES: dict[str, bytes] = {}
+
+
+def _ns_prefix(namespace: str) -> bytes:
+    prefix = _NS_BYTES.get(namespace)
+    if prefix is None:
+        prefix = _NS_BYTES[namespace] = namespace.encode() + b':'
+    return prefix
+
+
+@lru_cache(maxsize=4096)
+def _cached_key(namespace: str, frozen_params: tuple) -> str:
+    """Hash memoizado de (namespace, params congelados)."""
+    h = hashlib.blake2b(_ns_prefix(namespace), digest_size=12)
+    _hash_params(h, frozen_params)
+    return h.hexdigest()
+
+
+if HAS_DISKCACHE and HAS_ORJSON:
+    class OrjsonDisk(diskcache.Disk):
+        """
+        Serializa valores do L2 com orjson em vez de pickle.
+        Só usa JSON quando o valor sobrevive ao round-trip sem mudar
+        (ex.: dataclasses e tuplas continuam indo por pickle).
+        Payloads em bytes levam um prefixo para distinguir JSON de bytes crus.
+        """
+
+        _OPTS = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+        _PREFIX_JSON = b'J'
+        _PREFIX_BYTES = b'B'
+
+        def store(self, value, read, key=diskcache.core.UNKNOWN):
+            if not read:
+                if isinstance(value, bytes):
+                    return super().store(self._PREFIX_BYTES + value, read, key=key)
+                try:
+                    data = orjson.dumps(value, option=self._OPTS)
+                    if orjson.loads(data) == value:
+                        return super().store(self._PREFIX_JSON + data, read, key=key)
+                except TypeError:
+                    pass
+            return super().store(value, read, key=key)
+
+        def fetch(self, mode, filename, value, read):
+            data = super().fetch(mode, filename, value, read)
+            if not read and isinstance(data, bytes):
+                if data[:1] == self._PREFIX_JSON:
+                    return orjson.loads(data[1:])
+                if data[:1] == self._PREFIX_BYTES:
+                    return data[1:]
+            return data
+else:
+    OrjsonDisk = None
+
+
+# O L3 é compartilhado pela rede: só trafega JSON, nunca pickle (quem
+# escreve no Redis não pode virar execução de código nos workers).
+# Tuplas e dataclasses conhecidas vão com marcadores e são reconstruídas.
+_L3_TUPLA = "__tuple__"
+_L3_CLASSE = "__dataclass__"
+_l3_parse = orjson.loads if HAS_ORJSON else json.loads
+
+
+@lru_cache(maxsize=1)
+def _l3_tipos() -> dict[str, type]:
+    """Dataclasses de scout_types que podem ser reconstruídas a partir do L3."""
+    import scout_types
+    return {
+        nome: obj for nome, obj in vars(scout_types).items()
+        if isinstance(obj, type) and is_dataclass(obj)
+    }
+
+
+def _l3_para_json(value: Any) -> Any:
+    """Estrutura só com tipos JSON (+ marcadores). TypeError se não houver como."""
+    # Tipo exato: subclasses (ex.: enums str) voltariam como o tipo base
+    if value is None or type(value) in (str, bool, int, float):
+        return value
+    if type(value) is list:
+        return [_l3_para_json(v) for v in value]
+    if type(value) is tuple:
+        return {_L3_TUPLA: [_l3_para_json(v) for v in value]}
+    if type(value) is dict:
+        if _L3_TUPLA in value or _L3_CLASSE in value or not all(isinstance(k, str) for k in value):
+            raise TypeError("dict ambíguo ou com chave não-str")
+        return {k: _l3_para_json(v) for k, v in value.items()}
+    cls = type(value)
+    if is_dataclass(value) and _l3_tipos().get(cls.__name__) is cls:
+        return {
+            _L3_CLASSE: cls.__name__,
+            "campos": {f.name: _l3_para_json(getattr(value, f.name)) for f in fields(value) if f.init},
+        }
+    raise TypeError(f"{cls.__name__} não vai para o L3")
+
+
+def _l3_de_json(obj: Any) -> Any:
+    """Inverso de _l3_para_json."""
+    if isinstance(obj, list):
+        return [_l3_de_json(v) for v in obj]
+    if isinstance(obj, dict):
+        if _L3_TUPLA in obj:
+            return tuple(_l3_de_json(v) for v in obj[_L3_TUPLA])
+        if _L3_CLASSE in obj:
+            cls = _l3_tipos().get(obj[_L3_CLASSE])
+            if cls is None:
+                raise ValueError(f"Classe desconhecida no L3: {obj[_L3_CLASSE]!r}")
+            return cls(**{k: _l3_de_json(v) for k, v in obj["campos"].items()})
+        return {k: _l3_de_json(v) for k, v in obj.items()}
+    return obj
+
+
+def _l3_dumps(value: Any) -> Optional[bytes]:
+    """
+    Serializa para o L3 (JSON). Retorna None quando o valor não é JSON-safe
+    ou não sobrevive ao round-trip: aí o valor fica só no L1/L2 deste processo.
+    """
+    try:
+        obj = _l3_para_json(value)
+        if HAS_ORJSON:
+            data = orjson.dumps(obj)
+        else:
+            data = json.dumps(obj, ensure_ascii=False, allow_nan=False).encode()
+        if _l3_de_json(_l3_parse(data)) != value:
+            return None
+    except (TypeError, ValueError):
+        return None
+    return b'J' + data
+
+
+def _l3_loads(data: bytes) -> Any:
+    """Inverso de _l3_dumps. Qualquer outro formato (ex.: pickle legado) é recusado."""
+    if data[:1] != b'J':
+        raise ValueError("Entrada do L3 fora do formato JSON")
+    return _l3_de_json(_l3_parse(data[1:]))
+
+
+class _CountMinSketch:
+    """
+    Estimador de frequência compacto (4 × 4096 contadores).
+    Usado para promover ao L1 apenas chaves lidas repetidamente do L2.
+    """
+
+    def __init__(self, depth: int = 4, width: int = 4096, decay_every: int = 4096):
+        self._depth = depth
+        self._width = width
+        self._rows = [[0] * width for _ in range(depth)]
+        self._decay_every = decay_every
+        self._ops = 0
+
+    def _indices(self, key: str):
+        # A chave já é um hash hex (blake2b): fatiamos em pedaços independentes
+        step = max(len(key) // self._depth, 1)
+        for i in range(self._depth):
+            yield i, int(key[i * step:(i + 1) * step] or "0", 16) % self._width
+
+    def increment(self, key: str) -> int:
+        """Incrementa a chave e retorna a frequência estimada."""
+        estimate = None
+        for row, col in self._indices(key):
+            self._rows[row][col] += 1
+            value = self._rows[row][col]
+            estimate = value if estimate is None else min(estimate, value)
+
+        self._ops += 1
+        if self._ops >= self._decay_every:
+            self._decay()
+        return estimate or 0
+
+    def _decay(self):
+        """Divide todos os contadores por 2 (envelhecimento)."""
+        for row in self._rows:
+            for i, value in enumerate(row):
+                row[i] = value >> 1
+        self._ops = 0
+
 
 class CacheService:
     """Cache de dois níveis para resultados de API."""
     
-    def __init__(self, cache_dir: str = ".scout_cache", default_ttl: int = 3600):
-        # L1 — Memória (dict simples)
-        self._l1: dict[str, dict] = {}
+    def __init__(self, cache_dir: str = ".scout_cache", default_ttl: int = 3600,
+                 max_l1_size: int = 1024, promote_threshold: int = 2,
+                 redis_url: Optional[str] = None):
+        # L1 — Memória (LRU limitado a max_l1_size entradas)
+        self._l1: OrderedDict[str, dict] = OrderedDict()
+        # O orquestrador chama os agentes em threads: L1 protegido por lock
+        self._l1_lock = threading.RLock()
         self._default_ttl = default_ttl
+        self.max_l1_size = max_l1_size
+        
+        # Frequência de leituras no L2 (promoção só a partir da 2ª leitura)
+        self._cms = _CountMinSketch()
+        self.promote_threshold = promote_threshold
+        
+        # Varredura periódica de expirados no L1
+        self._sweep_interval = 60.0
+        self._last_sweep = time.time()
         
         # L2 — Disco
         if HAS_DISKCACHE:
-            self._l2 = diskcache.Cache(cache_dir, size_limit=500 * 1024 * 1024)  # 500MB
+            disk_kwargs = {"disk": OrjsonDisk} if OrjsonDisk is not None else {}
+            self._l2 = diskcache.Cache(cache_dir, size_limit=500 * 1024 * 1024,  # 500MB
+                                       **disk_kwargs)
         else:
             self._l2 = None
         
-        self._hits = 0
+        # L3 — Redis compartilhado entre workers (opcional)
+        self._l3 = None
+        if redis_url and HAS_REDIS:
+            try:
+                self._l3 = redis.Redis.from_url(redis_url, socket_timeout=2)
+            except Exception:
+                self._l3 = None
+        
+        self._tier_hits = {"l1": 0, "l2": 0, "l3": 0}
         self._misses = 0
+        
+        # len(L2) é um COUNT(*) no sqlite: guardamos (valor, timestamp)
+        self._l2_size_cache: tuple[int, float] = (0, 0.0)
+        self._l2_size_ttl = 5.0
+    
+    @staticmethod
+    def _l3_key(key: str) -> str:
+        return f"scout:{key}"
     
     def _make_key(self, namespace: str, params: dict) -> str:
-        """Gera uma chave de cache determinística."""
-        raw = f"{namespace}:{json.dumps(params, sort_keys=True, default=str)}"
-        return hashlib.sha256(raw.encode()).hexdigest()[:24]
+        """
+        Gera uma chave de cache determinística.
+        `params` deve conter apenas campos de identidade (ex.: empresa, cnpj),
+        nunca o objeto de resultado inteiro.
+        """
+        try:
+            return _cached_key(namespace, _freeze(params))
+        except TypeError:
+            pass  # params com valores não-hasheáveis: caminho sem memoização
+        h = hashlib.blake2b(_ns_prefix(namespace), digest_size=12)
+        h.update(_dumps_key(params))
+        return h.hexdigest()
     
-    def get(self, namespace: str, params: dict) -> Optional[Any]:
-        """Busca no cache L1 → L2."""
-        key = self._make_key(namespace, params)
-        
+    def _l1_put(self, key: str, entry: dict):
+        """Insere no L1 como mais recente e descarta os menos usados."""
+        with self._l1_lock:
+            self._l1[key] = entry
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.max_l1_size:
+                self._l1.popitem(last=False)
+    
+    def _maybe_sweep(self, now: float):
+        """Remove em lote as entradas expiradas do L1 (no máximo 1x por intervalo)."""
+        if now - self._last_sweep < self._sweep_interval:
+            return
+        with self._l1_lock:
+            expirados = [k for k, v in self._l1.items() if v['expires'] <= now]
+            for k in expirados:
+                del self._l1[k]
+            self._last_sweep = now
+    
+    def _lookup(self, key: str, namespace: str, now: float) -> tuple[Optional[Any], Optional[str]]:
+        """
+        Caminho único de leitura L1 → L2 → L3.
+        Retorna (valor, camada) — camada é "l1"/"l2"/"l3", ou None no miss.
+        """
         # L1 check
-        if key in self._l1:
-            entry = self._l1[key]
-            if entry['expires'] > time.time():
-                self._hits += 1
-                return entry['value']
-            else:
+        with self._l1_lock:
+            entry = self._l1.get(key)
+            if entry is not None:
+                if entry['expires'] > now:
+                    self._l1.move_to_end(key)
+                    return entry['value'], "l1"
                 del self._l1[key]
         
-        # L2 check
+        # L2 check — a expiração é nativa do diskcache (expire=ttl no set)
         if self._l2 is not None:
             try:
-                entry = self._l2.get(key)
-                if entry is not None and entry.get('expires', 0) > time.time():
-                    # Promote to L1
-                    self._l1[key] = entry
-                    self._hits += 1
-                    return entry['value']
+                value, expires, tag = self._l2.get(key, expire_time=True, tag=True)
+                # tag=None: entrada antiga (formato com dict-envelope) → ignora
+                if value is not None and tag is not None:
+                    # Promote to L1 (só chaves quentes)
+                    if self._cms.increment(key) >= self.promote_threshold:
+                        self._l1_put(key, {
+                            'value': value,
+                            'expires': expires or now + self._default_ttl,
+                            'namespace': tag,
+                        })
+                    return value, "l2"
             except Exception:
                 pass
         
-        self._misses += 1
-        return None
+        # L3 check — aquece L1 + L2 deste processo com a chave compartilhada
+        if self._l3 is not None:
+            try:
+                pipe = self._l3.pipeline()
+                pipe.get(self._l3_key(key))
+                pipe.ttl(self._l3_key(key))
+                data, ttl = pipe.execute()
+                if data is not None:
+                    value = _l3_loads(data)
+                    ttl = ttl if ttl and ttl > 0 else self._default_ttl
+                    self._set_local(key, namespace, value, ttl, now)
+                    return value, "l3"
+            except Exception:
+                pass
+        
+        return None, None
     
-    def set(self, namespace: str, params: dict, value: Any, ttl: Optional[int] = None):
-        """Armazena em L1 + L2."""
-        key = self._make_key(namespace, params)
+    def _get_by_key(self, key: str, namespace: str, now: float) -> Optional[Any]:
+        """Busca a partir de uma chave já calculada, contabilizando a camada."""
+        value, tier = self._lookup(key, namespace, now)
+        if tier is None:
+            self._misses += 1
+        else:
+            self._tier_hits[tier] += 1
+        return value
+    
+    def _set_by_key(self, key: str, namespace: str, value: Any,
+                    ttl: Optional[int], now: float):
+        """Armazena em L1 + L2 (+ L3) a partir de uma chave já calculada."""
         ttl = ttl or self._default_ttl
+        self._set_local(key, namespace, value, ttl, now)
+        
+        # L3
+        if self._l3 is not None:
+            data = _l3_dumps(value)
+            if data is not None:
+                try:
+                    self._l3.setex(self._l3_key(key), ttl, data)
+                except Exception:
+                    pass
+    
+    def _set_local(self, key: str, namespace: str, value: Any, ttl: int, now: float):
+        """Armazena em L1 + L2 (camadas locais ao processo)."""
         entry = {
             'value': value,
-            'expires': time.time() + ttl,
+            'expires': now + ttl,
             'namespace': namespace,
         }
         
         # L1
-        self._l1[key] = entry
+        self._l1_put(key, entry)
         
-        # L2
+        # L2 — só o valor; TTL e namespace ficam nos metadados do diskcache
         if self._l2 is not None:
             try:
-                self._l2.set(key, entry, expire=ttl)
+                self._l2.set(key, value, expire=ttl, tag=namespace)
             except Exception:
                 pass
     
+    def get(self, namespace: str, params: dict) -> Optional[Any]:
+        """Busca no cache L1 → L2 → L3."""
+        now = time.time()  # um único "agora" para todas as camadas
+        self._maybe_sweep(now)
+        return self._get_by_key(self._make_key(namespace, params), namespace, now)
+    
+    def set(self, namespace: str, params: dict, value: Any, ttl: Optional[int] = None):
+        """Armazena em L1 + L2 (+ L3)."""
+        now = time.time()
+        self._maybe_sweep(now)
+        self._set_by_key(self._make_key(namespace, params), namespace, value, ttl, now)
+    
+    def get_or_set(self, namespace: str, params: dict, factory: Callable[[], Any],
+                   ttl: Optional[int] = None) -> Any:
+        """
+        Busca no cache; no miss chama `factory()` e armazena o resultado.
+        A chave é calculada uma única vez. Resultados None não são cacheados.
+        """
+        now = time.time()
+        self._maybe_sweep(now)
+        key = self._make_key(namespace, params)
+        
+        value = self._get_by_key(key, namespace, now)
+        if value is not None:
+            return value
+        
+        value = factory()
+        if value is not None:
+            self._set_by_key(key, namespace, value, ttl, time.time())
+        return value
+    
     def invalidate(self, namespace: str, params: dict):
         """Remove entrada específica."""
         key = self._make_key(namespace, params)
-        self._l1.pop(key, None)
+        with self._l1_lock:
+            self._l1.pop(key, None)
         if self._l2 is not None:
             try:
                 self._l2.delete(key)
             except Exception:
                 pass
+        if self._l3 is not None:
+            try:
+                self._l3.delete(self._l3_key(key))
+            except Exception:
+                pass
     
     def clear_all(self):
         """Limpa todo o cache."""
-        self._l1.clear()
+        with self._l1_lock:
+            self._l1.clear()
         if self._l2 is not None:
             try:
                 self._l2.clear()
             except Exception:
                 pass
+        if self._l3 is not None:
+            try:
+                for k in self._l3.scan_iter(match=self._l3_key("*"), count=500):
+                    self._l3.delete(k)
+            except Exception:
+                pass
+    
+    def _l2_size(self) -> int:
+        """Tamanho do L2, reconsultado no máximo a cada _l2_size_ttl segundos."""
+        if self._l2 is None:
+            return 0
+        size, ts = self._l2_size_cache
+        now = time.time()
+        if now - ts >= self._l2_size_ttl:
+            try:
+                size = len(self._l2)
+            except Exception:
+                pass
+            self._l2_size_cache = (size, now)
+        return size
+    
+    @property
+    def _hits(self) -> int:
+        return sum(self._tier_hits.values())
+    
+    @property
+    def hit_rate(self) -> str:
+        """Hit rate formatado, sem montar o dict completo de stats."""
+        hits = self._hits
+        total = hits + self._misses
+        return f"{(hits / total * 100):.1f}%" if total > 0 else "0%"
     
     @property
     def stats(self) -> dict:
-        total = self._hits + self._misses
         return {
             "hits": self._hits,
             "misses": self._misses,
-            "hit_rate": f"{(self._hits / total * 100):.1f}%" if total > 0 else "0%",
+            "tier_hits": dict(self._tier_hits),
+            "hit_rate": self.hit_rate,
             "l1_size": len(self._l1),
-            "l2_size": len(self._l2) if self._l2 else 0,
+            "l2_size": self._l2_size(),
+            "l3_enabled": self._l3 is not None,
         }
 
 
-# Singleton global
-cache = CacheService()
+# Singleton global (L3 ativo se SCOUT_REDIS_URL estiver definido)
+cache = CacheService(redis_url=os.environ.get("SCOUT_REDIS_URL"))
@@ -5,20 +5,23 @@ Interface Streamlit com pipeline robusto de 6 passos.
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
-import time
 import random
 import json
+import re
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
-from services.dossier_orchestrator import gerar_dossie_completo
 from services.market_estimator import calcular_sas
-from services.cnpj_service import consultar_cnpj, formatar_cnpj, validar_cnpj, limpar_cnpj
+from services.cnpj_service import (
+    consultar_cnpj, formatar_cnpj, validar_e_formatar_cnpj,
+)
 from services import cache
 from services.request_queue import request_queue
-from utils.market_intelligence import (
-    ARGUMENTOS_CONCORRENCIA, get_contexto_cnae, get_contexto_regional,
-)
-from scout_types import DossieCompleto, Tier, QualityLevel
+from scout_types import DossieCompleto, EMPTY_CNPJ, Tier, QualityLevel
 
 
 # =============================================================================
@@ -32,7 +35,7 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-SARA_PHRASES = [
+SARA_PHRASES = (
     "☕ Enchendo a garrafa de café e calibrando os satélites...",
     "🛰️ Ativando reconhecimento orbital...",
     "🚜 Ligando os motores da inteligência...",
@@ -44,13 +47,21 @@ SARA_PHRASES = [
     "💰 Rastreando movimentações no mercado de capitais...",
     "🔍 Investigando CRAs, Fiagros e governança...",
     "🧠 Gemini Pro está pensando profundamente...",
-]
+)
+
+# Gerador próprio: não disputa o estado global do módulo random entre sessões
+_RNG = random.Random()
+
+
+def sara_phrase() -> str:
+    """Frase aleatória da Sara para a barra de progresso."""
+    return _RNG.choice(SARA_PHRASES)
 
 # =============================================================================
 # CSS
 # =============================================================================
 
-st.markdown("""
+_CSS_RAW = """
 <style>
     /* Métricas */
     div[data-testid="stMetric"] {
@@ -116,7 +127,127 @@ st.markdown("""
     .tier-prata { background: linear-gradient(135deg, #e5e7eb, #d1d5db); color: #374151; }
     .tier-bronze { background: linear-gradient(135deg, #fed7aa, #fdba74); color: #9a3412; }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+@st.cache_resource
+def _css() -> str:
+    """Bloco de estilos minificado (montado uma vez por processo).
+
+    Remove comentários e espaços redundantes para reduzir o payload
+    enviado ao navegador em cada rerun.
+    """
+    css = re.sub(r"/\*.*?\*/", "", _CSS_RAW, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+# O Streamlit reconstrói a página a cada rerun: a injeção precisa acontecer
+# sempre, mas a string vem do cache de recursos.
+st.markdown(_css(), unsafe_allow_html=True)
+
+
+# =============================================================================
+# EXPORTAÇÃO (cacheada por dossiê — não reconstrói a cada rerun)
+# =============================================================================
+
+@st.cache_data(ttl=3600)
+def _build_md(dossie_id: str, _dossie: DossieCompleto) -> str:
+    """Markdown completo do dossiê. `dossie_id` é a chave do cache."""
+    nome_grupo = _dossie.dados_operacionais.nome_grupo or _dossie.empresa_alvo
+    fin = _dossie.dados_financeiros
+    
+    md_content = f"# Dossiê: {nome_grupo}\n"
+    md_content += f"**Score SAS 4.0:** {_dossie.sas_result.score}/1000 — {_dossie.sas_result.tier.value}\n\n"
+    md_content += f"**Gerado em:** {_dossie.timestamp_geracao}\n\n---\n\n"
+    
+    for secao in _dossie.secoes_analise:
+        md_content += f"## {secao.icone} {secao.titulo}\n\n{secao.conteudo}\n\n---\n\n"
+    
+    if fin.movimentos_financeiros:
+        md_content += "## 💰 Movimentos Financeiros\n\n"
+        for m in fin.movimentos_financeiros:
+            md_content += f"- {m}\n"
+    
+    return md_content
+
+
+@st.cache_data(ttl=3600)
+def _build_json(dossie_id: str, _dossie: DossieCompleto) -> str:
+    """Export JSON do dossiê. `dossie_id` é a chave do cache."""
+    fin = _dossie.dados_financeiros
+    json_export = {
+        "empresa": _dossie.dados_operacionais.nome_grupo or _dossie.empresa_alvo,
+        "score": _dossie.sas_result.score,
+        "tier": _dossie.sas_result.tier.value,
+        "breakdown": _dossie.sas_result.breakdown.to_dict(),
+        "dados_operacionais": {
+            "hectares": _dossie.dados_operacionais.hectares_total,
+            "culturas": _dossie.dados_operacionais.culturas,
+            "regioes": _dossie.dados_operacionais.regioes_atuacao,
+        },
+        "dados_financeiros": {
+            "capital": fin.capital_social_estimado,
+            "funcionarios": fin.funcionarios_estimados,
+            "movimentos": fin.movimentos_financeiros,
+            "fiagros": fin.fiagros_relacionados,
+            "cras": fin.cras_emitidos,
+        },
+        "timestamp": _dossie.timestamp_geracao,
+    }
+    if HAS_ORJSON:
+        return orjson.dumps(json_export, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(json_export, indent=2, ensure_ascii=False)
+
+
+# =============================================================================
+# GRÁFICOS
+# =============================================================================
+
+@st.cache_data(max_entries=32)
+def _build_spider(values: tuple, max_values: tuple) -> go.Figure:
+    """Spider chart do breakdown SAS, cacheado pelos valores dos pilares."""
+    categories = ["Músculo\n(Porte)", "Complexidade", "Gente\n(Gestão)", "Momento\n(Gov/Tech)"]
+    percentages = [v/m*100 for v, m in zip(values, max_values)]
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatterpolar(
+        r=percentages + [percentages[0]],
+        theta=categories + [categories[0]],
+        fill='toself',
+        name='Score',
+        line_color='#667eea',
+        fillcolor='rgba(102, 126, 234, 0.3)',
+    ))
+    
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, 100], ticksuffix="%"),
+        ),
+        showlegend=False,
+        height=350,
+        margin=dict(l=60, r=60, t=30, b=30),
+    )
+    
+    return fig
+
+
+@st.cache_data(max_entries=32)
+def _build_score_df(musculo: int, complexidade: int, gente: int, momento: int) -> pd.DataFrame:
+    """Tabela do breakdown SAS, cacheada pelos pontos de cada pilar."""
+    linhas = [
+        ("Músculo (Porte)", musculo, 400),
+        ("Complexidade", complexidade, 250),
+        ("Gente (Gestão)", gente, 200),
+        ("Momento (Gov)", momento, 150),
+    ]
+    df = pd.DataFrame.from_records(
+        [(pilar, pts, mx, f"{pts/mx*100:.0f}%") for pilar, pts, mx in linhas],
+        columns=["Pilar", "Pontos", "Máx", "Pct"],
+    )
+    return df.astype({"Pontos": "int32", "Máx": "int32"})
 
 
 # =============================================================================
@@ -167,10 +298,10 @@ with st.sidebar:
     
     # Validação visual do CNPJ
     if target_cnpj:
-        cnpj_limpo = limpar_cnpj(target_cnpj)
-        if validar_cnpj(cnpj_limpo):
-            st.caption(f"✅ CNPJ válido: {formatar_cnpj(cnpj_limpo)}")
-        elif len(cnpj_limpo) > 0:
+        cnpj_ok, cnpj_fmt = validar_e_formatar_cnpj(target_cnpj)
+        if cnpj_ok:
+            st.caption(f"✅ CNPJ válido: {cnpj_fmt}")
+        elif len(cnpj_fmt) > 0:
             st.caption("❌ CNPJ inválido")
     
     st.markdown("---")
@@ -185,7 +316,7 @@ with st.sidebar:
         
         executar_audit_ia = st.checkbox("Executar Auditoria por IA", value=True)
         
-        st.caption(f"Cache: {cache.stats['hit_rate']} hit rate | "
+        st.caption(f"Cache: {cache.hit_rate} hit rate | "
                    f"Queue: {request_queue.stats['total_requests']} requisições")
     
     st.markdown("---")
@@ -247,6 +378,8 @@ if not target_company and st.session_state.dossie is None:
 
 elif btn_investigate and target_company:
     # === EXECUÇÃO DO PIPELINE ===
+    # Clique explícito sempre regera (ex.: refazer após resultado parcial); nos
+    # demais reruns o dossiê da sessão é reexibido lá embaixo, sem pipeline
     st.session_state.dossie = None
     st.session_state.logs = []
     
@@ -254,6 +387,7 @@ elif btn_investigate and target_company:
     header_container = st.container()
     progress_container = st.container()
     log_container = st.container()
+    stream_container = st.container()
     
     with header_container:
         st.header(f"🔍 Investigando: {target_company}")
@@ -267,11 +401,29 @@ elif btn_investigate and target_company:
     def update_progress(pct: float, msg: str):
         progress_bar.progress(min(pct, 1.0))
         status_text.markdown(f"**{msg}**")
-        phase_text.caption(random.choice(SARA_PHRASES))
+        phase_text.caption(sara_phrase())
     
     def add_log(msg: str):
         st.session_state.logs.append(msg)
     
+    # Prévia da análise estratégica (Passo 5) enquanto o modelo escreve
+    with stream_container:
+        secao_placeholders = [st.empty() for _ in range(4)]
+    
+    # Seções já fechadas por ||| são desenhadas uma última vez e congeladas;
+    # a cada chunk só a seção em escrita é redesenhada.
+    secoes_fechadas = [0]
+    
+    def update_stream(texto_parcial: str):
+        partes = texto_parcial.split('|||', 3)
+        for i in range(secoes_fechadas[0], len(partes)):
+            secao_placeholders[i].markdown(partes[i].strip())
+        secoes_fechadas[0] = len(partes) - 1
+    
+    # Import tardio: o SDK google.genai (httpx, pydantic...) só carrega na primeira
+    # investigação, não na primeira renderização da página
+    from services.dossier_orchestrator import gerar_dossie_completo
+    
     try:
         dossie = gerar_dossie_completo(
             empresa_alvo=target_company,
@@ -279,6 +431,7 @@ elif btn_investigate and target_company:
             cnpj=target_cnpj,
             log_callback=add_log,
             progress_callback=update_progress,
+            stream_callback=update_stream,
         )
         
         st.session_state.dossie = dossie
@@ -304,8 +457,106 @@ elif btn_investigate and target_company:
 # EXIBIÇÃO DO DOSSIÊ
 # =============================================================================
 
-if st.session_state.dossie is not None:
-    dossie: DossieCompleto = st.session_state.dossie
+# Atributo de Verticalizacao -> rótulo do badge (ordem de exibição)
+_BADGE_MAP = (
+    ("agroindustria", "🏭 Agroindústria"),
+    ("sementeira", "🌱 Sementeira"),
+    ("silos", "🏗️ Silos"),
+    ("algodoeira", "☁️ Algodoeira"),
+    ("usina", "⚡ Usina"),
+    ("frigorifico", "🥩 Frigorífico"),
+)
+
+
+# Nível do Quality Gate -> indicador de cor
+_COR_NIVEL = {
+    QualityLevel.EXCELENTE: "🟢",
+    QualityLevel.BOM: "🔵",
+    QualityLevel.ACEITAVEL: "🟡",
+    QualityLevel.INSUFICIENTE: "🔴",
+}
+
+
+@st.cache_data(max_entries=64)
+def build_badges(vert_flags: tuple, governanca: bool) -> str:
+    """Monta a linha de badges a partir das flags de verticalização (função pura)."""
+    badges = [label for (_, label), ativo in zip(_BADGE_MAP, vert_flags) if ativo]
+    if governanca:
+        badges.append("📊 Governança")
+    return " ".join(f"`{b}`" for b in badges)
+
+
+# Fragmentos: interações dentro deles (ex.: botões de exportação) reexecutam
+# só o próprio bloco, não o dossiê inteiro.
+@st.fragment
+def _score_panel(sas_result):
+    """Spider chart, tabela e justificativas do score SAS."""
+    # === SCORE BREAKDOWN (SPIDER CHART) ===
+    st.markdown("### 📊 Breakdown do Score SAS 4.0")
+    
+    col_chart, col_table = st.columns([2, 1])
+    breakdown = sas_result.breakdown
+    
+    with col_chart:
+        fig = _build_spider(
+            (breakdown.musculo, breakdown.complexidade, breakdown.gente, breakdown.momento),
+            (400, 250, 200, 150),
+        )
+        
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with col_table:
+        df_score = _build_score_df(
+            breakdown.musculo, breakdown.complexidade, breakdown.gente, breakdown.momento,
+        )
+        st.dataframe(df_score, hide_index=True, use_container_width=True)
+        
+        st.markdown(f"**Total: {sas_result.score}/1000** — {sas_result.tier.value}")
+    
+    # === JUSTIFICATIVAS DO SCORE ===
+    if sas_result.justificativas:
+        with st.expander("🔍 Justificativas do Cálculo"):
+            for j in sas_result.justificativas:
+                st.text(f"→ {j}")
+
+
+@st.fragment
+def _export_panel(dossie: DossieCompleto, nome_grupo: str):
+    """Botões de download/cópia do dossiê."""
+    # === EXPORTAÇÃO ===
+    st.markdown("---")
+    st.markdown("### 📤 Exportar Dossiê")
+    
+    col_export1, col_export2, col_export3 = st.columns(3)
+    
+    dossie_id = f"{dossie.empresa_alvo}|{dossie.timestamp_geracao}"
+    md_content = _build_md(dossie_id, dossie)
+    
+    with col_export1:
+        st.download_button(
+            "📝 Baixar Markdown",
+            data=md_content,
+            file_name=f"dossie_{nome_grupo.replace(' ', '_')}.md",
+            mime="text/markdown",
+            use_container_width=True,
+        )
+    
+    with col_export2:
+        st.download_button(
+            "📊 Baixar JSON",
+            data=_build_json(dossie_id, dossie),
+            file_name=f"dossie_{nome_grupo.replace(' ', '_')}.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+    
+    with col_export3:
+        if st.button("📋 Copiar Texto", use_container_width=True):
+            st.code(md_content, language="markdown")
+
+
+def render_dossier(dossie: DossieCompleto):
+    """Renderiza o dossiê completo (cabeçalho, métricas, seções e score)."""
     
     # === CABEÇALHO ===
     nome_grupo = dossie.dados_operacionais.nome_grupo or dossie.empresa_alvo
@@ -324,18 +575,13 @@ if st.session_state.dossie is not None:
         st.subheader(f"📋 Dossiê: {nome_grupo}")
         
         # Badges
-        badges = []
         vert = dossie.dados_operacionais.verticalizacao
-        if vert.agroindustria: badges.append("🏭 Agroindústria")
-        if vert.sementeira: badges.append("🌱 Sementeira")
-        if vert.silos: badges.append("🏗️ Silos")
-        if vert.algodoeira: badges.append("☁️ Algodoeira")
-        if vert.usina: badges.append("⚡ Usina")
-        if vert.frigorifico: badges.append("🥩 Frigorífico")
-        if dossie.dados_financeiros.governanca_corporativa: badges.append("📊 Governança")
-        
+        badges = build_badges(
+            tuple(bool(getattr(vert, attr)) for attr, _ in _BADGE_MAP),
+            bool(dossie.dados_financeiros.governanca_corporativa),
+        )
         if badges:
-            st.markdown(" ".join([f"`{b}`" for b in badges]))
+            st.markdown(badges)
         
         # Meta info
         st.caption(
@@ -347,16 +593,10 @@ if st.session_state.dossie is not None:
     with col_quality:
         if dossie.quality_report:
             qr = dossie.quality_report
-            level_colors = {
-                QualityLevel.EXCELENTE: "🟢",
-                QualityLevel.BOM: "🔵",
-                QualityLevel.ACEITAVEL: "🟡",
-                QualityLevel.INSUFICIENTE: "🔴",
-            }
             st.metric(
                 label="Quality Gate",
                 value=f"{qr.score_qualidade:.0f}%",
-                delta=f"{level_colors.get(qr.nivel, '')} {qr.nivel.value}",
+                delta=f"{_COR_NIVEL.get(qr.nivel, '')} {qr.nivel.value}",
             )
     
     st.markdown("---")
@@ -368,23 +608,21 @@ if st.session_state.dossie is not None:
         
         col_mov, col_fiagro = st.columns(2)
         
+        # Um st.markdown por coluna: cada chamada é uma mensagem no WebSocket
         with col_mov:
-            for item in fin.movimentos_financeiros:
-                st.markdown(f"- 🏦 **{item}**")
+            if fin.movimentos_financeiros:
+                st.markdown("\n".join(f"- 🏦 **{item}**" for item in fin.movimentos_financeiros))
         
         with col_fiagro:
+            blocos = []
             if fin.fiagros_relacionados:
-                st.markdown("**Fiagros:**")
-                for f_item in fin.fiagros_relacionados:
-                    st.markdown(f"- 📈 {f_item}")
+                blocos.append("**Fiagros:**\n\n" + "\n".join(f"- 📈 {f_item}" for f_item in fin.fiagros_relacionados))
             if fin.cras_emitidos:
-                st.markdown("**CRAs:**")
-                for c_item in fin.cras_emitidos:
-                    st.markdown(f"- 📜 {c_item}")
+                blocos.append("**CRAs:**\n\n" + "\n".join(f"- 📜 {c_item}" for c_item in fin.cras_emitidos))
             if fin.auditorias:
-                st.markdown("**Auditorias:**")
-                for a_item in fin.auditorias:
-                    st.markdown(f"- ✅ {a_item}")
+                blocos.append("**Auditorias:**\n\n" + "\n".join(f"- ✅ {a_item}" for a_item in fin.auditorias))
+            if blocos:
+                st.markdown("\n\n".join(blocos))
         
         st.markdown("---")
     
@@ -410,60 +648,7 @@ if st.session_state.dossie is not None:
     
     st.markdown("---")
     
-    # === SCORE BREAKDOWN (SPIDER CHART) ===
-    st.markdown("### 📊 Breakdown do Score SAS 4.0")
-    
-    col_chart, col_table = st.columns([2, 1])
-    
-    with col_chart:
-        breakdown = dossie.sas_result.breakdown
-        categories = ["Músculo\n(Porte)", "Complexidade", "Gente\n(Gestão)", "Momento\n(Gov/Tech)"]
-        values = [breakdown.musculo, breakdown.complexidade, breakdown.gente, breakdown.momento]
-        max_values = [400, 250, 200, 150]
-        percentages = [v/m*100 for v, m in zip(values, max_values)]
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatterpolar(
-            r=percentages + [percentages[0]],
-            theta=categories + [categories[0]],
-            fill='toself',
-            name='Score',
-            line_color='#667eea',
-            fillcolor='rgba(102, 126, 234, 0.3)',
-        ))
-        
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(visible=True, range=[0, 100], ticksuffix="%"),
-            ),
-            showlegend=False,
-            height=350,
-            margin=dict(l=60, r=60, t=30, b=30),
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col_table:
-        df_score = pd.DataFrame([
-            {"Pilar": "Músculo (Porte)", "Pontos": breakdown.musculo, "Máx": 400,
-             "Pct": f"{breakdown.musculo/400*100:.0f}%"},
-            {"Pilar": "Complexidade", "Pontos": breakdown.complexidade, "Máx": 250,
-             "Pct": f"{breakdown.complexidade/250*100:.0f}%"},
-            {"Pilar": "Gente (Gestão)", "Pontos": breakdown.gente, "Máx": 200,
-             "Pct": f"{breakdown.gente/200*100:.0f}%"},
-            {"Pilar": "Momento (Gov)", "Pontos": breakdown.momento, "Máx": 150,
-             "Pct": f"{breakdown.momento/150*100:.0f}%"},
-        ])
-        st.dataframe(df_score, hide_index=True, use_container_width=True)
-        
-        st.markdown(f"**Total: {dossie.sas_result.score}/1000** — {dossie.sas_result.tier.value}")
-    
-    # === JUSTIFICATIVAS DO SCORE ===
-    if dossie.sas_result.justificativas:
-        with st.expander("🔍 Justificativas do Cálculo"):
-            for j in dossie.sas_result.justificativas:
-                st.text(f"→ {j}")
+    _score_panel(dossie.sas_result)
     
     st.markdown("---")
     
@@ -477,13 +662,13 @@ if st.session_state.dossie is not None:
         )
         
         with tab_sinais:
+            blocos = []
             if intel.sinais_compra:
-                for s in intel.sinais_compra:
-                    st.markdown(f"- 🟢 {s}")
+                blocos.append("\n".join(f"- 🟢 {s}" for s in intel.sinais_compra))
             if intel.dores_identificadas:
-                st.markdown("**Dores Identificadas:**")
-                for d in intel.dores_identificadas:
-                    st.markdown(f"- 🔴 {d}")
+                blocos.append("**Dores Identificadas:**\n\n" + "\n".join(f"- 🔴 {d}" for d in intel.dores_identificadas))
+            if blocos:
+                st.markdown("\n\n".join(blocos))
         
         with tab_noticias:
             for n in intel.noticias_recentes:
@@ -496,13 +681,9 @@ if st.session_state.dossie is not None:
         with tab_riscos:
             col_risk, col_opp = st.columns(2)
             with col_risk:
-                st.markdown("**⚠️ Riscos:**")
-                for r in intel.riscos:
-                    st.markdown(f"- {r}")
+                st.markdown("**⚠️ Riscos:**\n\n" + "\n".join(f"- {r}" for r in intel.riscos))
             with col_opp:
-                st.markdown("**💡 Oportunidades:**")
-                for o in intel.oportunidades:
-                    st.markdown(f"- {o}")
+                st.markdown("**💡 Oportunidades:**\n\n" + "\n".join(f"- {o}" for o in intel.oportunidades))
     
     st.markdown("---")
     
@@ -516,27 +697,31 @@ if st.session_state.dossie is not None:
     st.markdown("---")
     
     # === DADOS CNPJ ===
-    if dossie.dados_cnpj:
+    if dossie.dados_cnpj is not EMPTY_CNPJ:
         with st.expander("📋 Dados Cadastrais (CNPJ)"):
             cnpj_data = dossie.dados_cnpj
             
             col_a, col_b = st.columns(2)
             with col_a:
-                st.markdown(f"**Razão Social:** {cnpj_data.razao_social}")
-                st.markdown(f"**Nome Fantasia:** {cnpj_data.nome_fantasia}")
-                st.markdown(f"**CNPJ:** {formatar_cnpj(cnpj_data.cnpj)}")
-                st.markdown(f"**Situação:** {cnpj_data.situacao_cadastral}")
-                st.markdown(f"**Abertura:** {cnpj_data.data_abertura}")
+                st.markdown("\n\n".join([
+                    f"**Razão Social:** {cnpj_data.razao_social}",
+                    f"**Nome Fantasia:** {cnpj_data.nome_fantasia}",
+                    f"**CNPJ:** {formatar_cnpj(cnpj_data.cnpj)}",
+                    f"**Situação:** {cnpj_data.situacao_cadastral}",
+                    f"**Abertura:** {cnpj_data.data_abertura}",
+                ]))
             with col_b:
-                st.markdown(f"**Natureza Jurídica:** {cnpj_data.natureza_juridica}")
-                st.markdown(f"**Capital Social:** R$ {cnpj_data.capital_social:,.2f}")
-                st.markdown(f"**Porte:** {cnpj_data.porte}")
-                st.markdown(f"**CNAE:** {cnpj_data.cnae_principal} — {cnpj_data.cnae_descricao}")
-                st.markdown(f"**Local:** {cnpj_data.municipio}/{cnpj_data.uf}")
+                st.markdown("\n\n".join([
+                    f"**Natureza Jurídica:** {cnpj_data.natureza_juridica}",
+                    f"**Capital Social:** R$ {cnpj_data.capital_social:,.2f}",
+                    f"**Porte:** {cnpj_data.porte}",
+                    f"**CNAE:** {cnpj_data.cnae_principal} — {cnpj_data.cnae_descricao}",
+                    f"**Local:** {cnpj_data.municipio}/{cnpj_data.uf}",
+                ]))
             
             if cnpj_data.qsa:
                 st.markdown("**Quadro Societário:**")
-                df_qsa = pd.DataFrame(cnpj_data.qsa)
+                df_qsa = pd.DataFrame(cnpj_data.qsa.to_dict())
                 st.dataframe(df_qsa, hide_index=True, use_container_width=True)
     
     # === QUALITY GATE ===
@@ -544,74 +729,16 @@ if st.session_state.dossie is not None:
         with st.expander("✅ Relatório de Qualidade (Quality Gate)"):
             qr = dossie.quality_report
             
-            for check in qr.checks:
-                icon = "✅" if check.passou else "❌"
-                st.markdown(f"{icon} **{check.criterio}** — {check.nota}")
-            
+            blocos = [
+                f"{'✅' if check.passou else '❌'} **{check.criterio}** — {check.nota}"
+                for check in qr.checks
+            ]
             if qr.recomendacoes:
-                st.markdown("**Recomendações:**")
-                for rec in qr.recomendacoes:
-                    st.markdown(f"- {rec}")
+                blocos.append("**Recomendações:**\n\n" + "\n".join(f"- {rec}" for rec in qr.recomendacoes))
+            if blocos:
+                st.markdown("\n\n".join(blocos))
     
-    # === EXPORTAÇÃO ===
-    st.markdown("---")
-    st.markdown("### 📤 Exportar Dossiê")
-    
-    col_export1, col_export2, col_export3 = st.columns(3)
-    
-    # Markdown completo
-    md_content = f"# Dossiê: {nome_grupo}\n"
-    md_content += f"**Score SAS 4.0:** {dossie.sas_result.score}/1000 — {dossie.sas_result.tier.value}\n\n"
-    md_content += f"**Gerado em:** {dossie.timestamp_geracao}\n\n---\n\n"
-    
-    for secao in dossie.secoes_analise:
-        md_content += f"## {secao.icone} {secao.titulo}\n\n{secao.conteudo}\n\n---\n\n"
-    
-    if fin.movimentos_financeiros:
-        md_content += "## 💰 Movimentos Financeiros\n\n"
-        for m in fin.movimentos_financeiros:
-            md_content += f"- {m}\n"
-    
-    with col_export1:
-        st.download_button(
-            "📝 Baixar Markdown",
-            data=md_content,
-            file_name=f"dossie_{nome_grupo.replace(' ', '_')}.md",
-            mime="text/markdown",
-            use_container_width=True,
-        )
-    
-    with col_export2:
-        json_export = {
-            "empresa": nome_grupo,
-            "score": dossie.sas_result.score,
-            "tier": dossie.sas_result.tier.value,
-            "breakdown": dossie.sas_result.breakdown.to_dict(),
-            "dados_operacionais": {
-                "hectares": dossie.dados_operacionais.hectares_total,
-                "culturas": dossie.dados_operacionais.culturas,
-                "regioes": dossie.dados_operacionais.regioes_atuacao,
-            },
-            "dados_financeiros": {
-                "capital": fin.capital_social_estimado,
-                "funcionarios": fin.funcionarios_estimados,
-                "movimentos": fin.movimentos_financeiros,
-                "fiagros": fin.fiagros_relacionados,
-                "cras": fin.cras_emitidos,
-            },
-            "timestamp": dossie.timestamp_geracao,
-        }
-        st.download_button(
-            "📊 Baixar JSON",
-            data=json.dumps(json_export, indent=2, ensure_ascii=False),
-            file_name=f"dossie_{nome_grupo.replace(' ', '_')}.json",
-            mime="application/json",
-            use_container_width=True,
-        )
-    
-    with col_export3:
-        if st.button("📋 Copiar Texto", use_container_width=True):
-            st.code(md_content, language="markdown")
+    _export_panel(dossie, nome_grupo)
     
     # === LOG DE EXECUÇÃO ===
     with st.expander("🖥️ Log de Execução do Pipeline"):
@@ -620,3 +747,7 @@ if st.session_state.dossie is not None:
         
         st.markdown("---")
         st.caption(f"Cache: {cache.stats} | Queue: {request_queue.stats}")
+
+
+if st.session_state.dossie is not None:
+    render_dossier(st.session_state.dossie)
@@ -1,249 +1,640 @@
-from google import genai
-from google.genai import types
-import json
-import re
-import math
-
-# ==============================================================================
-# 1. HELPER: EXTRAÇÃO E LIMPEZA
-# ==============================================================================
-def clean_and_parse_json(text):
-    if not text: return None
-    try:
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match: return json.loads(match.group(0))
-    except: pass
-    try:
-        clean_text = text.replace('```json', '').replace('```', '').strip()
-        return json.loads(clean_text)
-    except: return None
-
-# ==============================================================================
-# 2. PERSONALIDADE E PROMPTS
-# ==============================================================================
-
-# AQUI ESTÁ A LISTA QUE FALTAVA
-SARA_PHRASES = [
-    "☕ Enchendo a garrafa de café e calibrando o GPS...",
-    "🚜 Ligando os motores e verificando o óleo da inteligência...",
-    "👢 Calçando a botina para entrar no mato digital...",
-    "🤠 Ajeitando o chapéu: hora de caçar oportunidades...",
-    "📡 Ajustando a antena da Starlink para achar sinal de dinheiro...",
-    "📊 Cruzando dados de satélite com balanços financeiros...",
-    "🚁 Sobrevoando a operação em busca de gargalos..."
-]
-
-SYSTEM_PROMPT_SARA = """
-    VOCÊ É: Sara, Analista Sênior de Inteligência de Vendas (Agro).
-    SUA MISSÃO: Escrever um briefing estratégico ("off-the-record") para um Executivo de Contas da Senior Sistemas.
-    
-    ESTRUTURA OBRIGATÓRIA DA RESPOSTA (Separada por '|||'):
-    [Perfil e Mercado] ||| [Complexidade e Dores] ||| [Fit Senior] ||| [Plano de Ataque]
-    
-    DIRETRIZES DE CONTEÚDO:
-    1. USE OS DADOS FINANCEIROS: Se o JSON diz que eles emitiram Fiagro ou CRA, você TEM que mencionar isso. Isso indica governança e dinheiro.
-    2. REALPOLITIK: Se eles têm 35k hectares e auditoria, eles não são "produtores rurais", são uma CORPORAÇÃO. Trate-os assim.
-    3. FALE DE DINHEIRO: Mencione os fundos, parceiros financeiros (Suno, XP, etc) se aparecerem nos dados.
-"""
-
-# ==============================================================================
-# 3. MOTOR SAS 4.0 (COM HEURÍSTICAS DE CORREÇÃO)
-# ==============================================================================
-def heuristic_fill(lead):
-    """
-    Se a busca na web falhar em trazer números exatos, usamos heurísticas de mercado
-    para não zerar o score de uma operação gigante.
-    """
-    hectares = lead.get('hectares_total', 0)
-    
-    # HEURÍSTICA 1: Estimativa de Funcionários (se for 0)
-    if lead.get('funcionarios_estimados', 0) == 0 and hectares > 0:
-        fator = 350 # Padrão Grãos
-        culturas_str = str(lead.get('culturas', [])).lower()
-        if 'cana' in culturas_str or 'batata' in culturas_str or 'alho' in culturas_str or 'semente' in culturas_str:
-            fator = 150 # Culturas intensivas exigem mais gente
-        
-        lead['funcionarios_estimados'] = math.ceil(hectares / fator)
-        lead['dados_inferidos'] = True # Flag para avisar no front
-
-    # HEURÍSTICA 2: Estimativa de Capital Operacional (se for 0)
-    if lead.get('capital_social_estimado', 0) == 0 and hectares > 0:
-        lead['capital_social_estimado'] = hectares * 2000 # Estimativa conservadora
-        lead['dados_inferidos'] = True
-
-    return lead
-
-def calculate_sas_score(lead):
-    # Aplica correções antes de calcular
-    lead = heuristic_fill(lead)
-
-    # Tabelas de Pontuação
-    def lookup_capital(val):
-        if val >= 100_000_000: return 200
-        if val >= 50_000_000: return 150
-        if val >= 10_000_000: return 100
-        if val >= 1_000_000: return 50
-        return 0
-
-    def lookup_hectares(val):
-        if val >= 50_000: return 200
-        if val >= 10_000: return 150
-        if val >= 3_000: return 100
-        if val >= 500: return 50
-        return 0
-    
-    def lookup_cultura(txt):
-        txt = str(txt).lower() if txt else ""
-        if 'cana' in txt: return 150
-        if 'semente' in txt: return 130
-        if 'algod' in txt: return 120
-        if 'café' in txt or 'alho' in txt or 'batata' in txt: return 110
-        if 'soja' in txt or 'milho' in txt: return 80
-        return 50
-
-    def lookup_funcionarios(val):
-        if val >= 500: return 120
-        if val >= 200: return 90
-        if val >= 100: return 60
-        if val >= 50: return 30
-        return 0
-    
-    # Extração
-    capital = lead.get('capital_social_estimado', 0)
-    hectares = lead.get('hectares_total', 0)
-    cultura = ', '.join(lead.get('culturas', []))
-    funcionarios = lead.get('funcionarios_estimados', 0)
-    
-    # Cálculo
-    pilar_musculo = min(lookup_capital(capital) + lookup_hectares(hectares), 400)
-    
-    cultura_pts = lookup_cultura(cultura)
-    vert_pts = 0
-    vert = lead.get('verticalizacao', {})
-    if vert.get('agroindustria'): vert_pts += 50
-    if vert.get('silos'): vert_pts += 30
-    if vert.get('sementeira'): vert_pts += 30
-    
-    pilar_complexidade = min(cultura_pts + vert_pts, 250)
-    
-    pilar_gente = min(lookup_funcionarios(funcionarios), 200)
-    
-    # Momento: Se tem Fiagro/CRA, ganha pontos de "S.A." (Governança)
-    movimentos = str(lead.get('movimentos_financeiros', '')).lower()
-    tem_gov = 'fiagro' in movimentos or 'cra' in movimentos or 'auditoria' in movimentos
-    pilar_momento = 100 if tem_gov else 60
-
-    sas_final = pilar_musculo + pilar_complexidade + pilar_gente + pilar_momento
-    
-    if sas_final >= 751: tier = "DIAMANTE 💎"
-    elif sas_final >= 501: tier = "OURO 🥇"
-    elif sas_final >= 251: tier = "PRATA 🥈"
-    else: tier = "BRONZE 🥉"
-    
-    return {
-        "score": int(sas_final),
-        "tier": tier,
-        "breakdown": {
-            "Músculo": pilar_musculo,
-            "Complexidade": pilar_complexidade,
-            "Gente": pilar_gente,
-            "Momento": pilar_momento
-        }
-    }
-
-# ==============================================================================
-# 4. AGENTES DE INVESTIGAÇÃO (PIPELINE DUPLO)
-# ==============================================================================
-
-def investigate_company(query_input, api_key):
-    client = genai.Client(api_key=api_key)
-    google_search_tool = types.Tool(google_search=types.GoogleSearch())
-    
-    # --- AGENTE 1: RECONHECIMENTO OPERACIONAL ---
-    recon_prompt = f"""
-    ATUE COMO: Investigador Agrícola. ALVO: "{query_input}"
-    
-    Descubra a estrutura física do Grupo Econômico:
-    1. Área total (Hectares). Se achar números diferentes, pegue o maior/mais recente.
-    2. Culturas (Soja, Milho, Algodão, Cana, HF).
-    3. Infraestrutura (Silos, Sementeiras, Algodoeiras).
-    
-    Retorne JSON:
-    {{
-        "nome_grupo": "Nome",
-        "hectares_total": numero,
-        "culturas": ["lista"],
-        "verticalizacao": {{ "agroindustria": bool, "sementeira": bool, "silos": bool }}
-    }}
-    Comece com {{ e termine com }}.
-    """
-    
-    try:
-        resp_recon = client.models.generate_content(
-            model='gemini-2.5-flash', contents=recon_prompt,
-            config=types.GenerateContentConfig(tools=[google_search_tool], temperature=0.1)
-        )
-        data_ops = clean_and_parse_json(resp_recon.text) or {}
-    except Exception as e:
-        data_ops = {"nome_grupo": query_input, "hectares_total": 0}
-
-    grupo_nome = data_ops.get('nome_grupo', query_input)
-
-    # --- AGENTE 2: SNIPER FINANCEIRO (Deep Dive) ---
-    fin_prompt = f"""
-    ATUE COMO: Analista de Mercado de Capitais. ALVO: "{grupo_nome}"
-    
-    Vasculhe a web procurando ESPECIFICAMENTE por:
-    1. Emissões de CRA (Certificados de Recebíveis do Agronegócio).
-    2. Fiagro (Fundos de Investimento) que investiram neles (Ex: Suno, XP, Valora).
-    3. Notícias de M&A ou Auditoria.
-    4. Capital Social (Procure em sites como Econodata, Casa dos Dados).
-    
-    Retorne JSON:
-    {{
-        "capital_social_estimado": numero (somente numeros),
-        "funcionarios_estimados": numero,
-        "movimentos_financeiros": ["Lista de fatos: Ex: Emissão de CRA de R$ 50M", "Fiagro Suno SNFZ11", "Auditoria XYZ"],
-        "resumo_financeiro": "Texto curto sobre a robustez financeira."
-    }}
-    Comece com {{ e termine com }}.
-    """
-    
-    try:
-        resp_fin = client.models.generate_content(
-            model='gemini-2.5-flash', contents=fin_prompt,
-            config=types.GenerateContentConfig(tools=[google_search_tool], temperature=0.1)
-        )
-        data_fin = clean_and_parse_json(resp_fin.text) or {}
-    except:
-        data_fin = {}
-
-    # --- FUSÃO DE DADOS ---
-    final_data = {**data_ops, **data_fin}
-    
-    if 'resumo_operacao' not in final_data:
-        final_data['resumo_operacao'] = f"Grupo com {final_data.get('hectares_total', '?')} ha. {final_data.get('resumo_financeiro', '')}"
-
-    # --- CÁLCULO E ANÁLISE ---
-    score_result = calculate_sas_score(final_data)
-    
-    analysis_prompt = f"""
-    CONTEXTO COMPLETO: {json.dumps(final_data)}
-    SCORE: {score_result['score']} ({score_result['tier']})
-    
-    {SYSTEM_PROMPT_SARA}
-    """
-    
-    try:
-        resp_analysis = client.models.generate_content(
-            model='gemini-2.5-flash', contents=analysis_prompt,
-            config=types.GenerateContentConfig(tools=[google_search_tool])
-        )
-        full_text = resp_analysis.text
-    except:
-        full_text = "Erro na análise."
-
-    sections = full_text.split('|||')
-    if len(sections) < 2: sections = [full_text, "", "", ""]
-        
-    return final_data, score_result, sections
+import streamlit as st
+from google import genai
+from google.genai import types
+from google.genai import errors as genai_errors
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
+import bisect
+import functools
+import hashlib
+import json
+import math
+import numpy as np
+import pandas as pd
+import re
+import threading
+import time
+import unicodedata
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=str).decode()
+except ImportError:
+    _json_loads = json.loads
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, default=str)
+
+try:
+    import diskcache
+    HAS_DISKCACHE = True
+except ImportError:
+    HAS_DISKCACHE = False
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# ==============================================================================
+# 1. HELPER: EXTRAÇÃO E LIMPEZA
+# ==============================================================================
+def _extract_json_object(text):
+    # Varredura única: primeiro '{' até o '}' que fecha, ignorando chaves em strings
+    start = text.find('{')
+    if start < 0: return None
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped: escaped = False
+            elif c == '\\': escaped = True
+            elif c == '"': in_string = False
+        elif c == '"': in_string = True
+        elif c == '{': depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0: return text[start:i + 1]
+    return None
+
+def clean_and_parse_json(text):
+    if not text: return None
+    if text.lstrip().startswith('{'):
+        try: return _json_loads(text)
+        except: pass
+    try:
+        candidate = _extract_json_object(text)
+        if candidate: return _json_loads(candidate)
+    except: pass
+    try:
+        clean_text = text.replace('```json', '').replace('```', '').strip()
+        return _json_loads(clean_text)
+    except: return None
+
+# ==============================================================================
+# 2. PERSONALIDADE E PROMPTS
+# ==============================================================================
+
+# AQUI ESTÁ A LISTA QUE FALTAVA
+SARA_PHRASES = [
+    "☕ Enchendo a garrafa de café e calibrando o GPS...",
+    "🚜 Ligando os motores e verificando o óleo da inteligência...",
+    "👢 Calçando a botina para entrar no mato digital...",
+    "🤠 Ajeitando o chapéu: hora de caçar oportunidades...",
+    "📡 Ajustando a antena da Starlink para achar sinal de dinheiro...",
+    "📊 Cruzando dados de satélite com balanços financeiros...",
+    "🚁 Sobrevoando a operação em busca de gargalos..."
+]
+
+SYSTEM_PROMPT_SARA = """
+    VOCÊ É: Sara, Analista Sênior de Inteligência de Vendas (Agro).
+    SUA MISSÃO: Escrever um briefing estratégico ("off-the-record") para um Executivo de Contas da Senior Sistemas.
+    
+    ESTRUTURA OBRIGATÓRIA DA RESPOSTA (Separada por '|||'):
+    [Perfil e Mercado] ||| [Complexidade e Dores] ||| [Fit Senior] ||| [Plano de Ataque]
+    
+    DIRETRIZES DE CONTEÚDO:
+    1. USE OS DADOS FINANCEIROS: Se o JSON diz que eles emitiram Fiagro ou CRA, você TEM que mencionar isso. Isso indica governança e dinheiro.
+    2. REALPOLITIK: Se eles têm 35k hectares e auditoria, eles não são "produtores rurais", são uma CORPORAÇÃO. Trate-os assim.
+    3. FALE DE DINHEIRO: Mencione os fundos, parceiros financeiros (Suno, XP, etc) se aparecerem nos dados.
+"""
+
+# ==============================================================================
+# 3. MOTOR SAS 4.0 (COM HEURÍSTICAS DE CORREÇÃO)
+# ==============================================================================
+_INTENSIVAS = re.compile(r'cana|batata|alho|semente')
+_GOVERNANCA = re.compile(r'fiagro|cra|auditoria')
+
+def heuristic_fill(lead, culturas_lc=None):
+    """
+    Se a busca na web falhar em trazer números exatos, usamos heurísticas de mercado
+    para não zerar o score de uma operação gigante.
+    `culturas_lc`: texto das culturas já em minúsculas (evita refazer o lower()).
+    """
+    hectares = lead.get('hectares_total', 0)
+    
+    # HEURÍSTICA 1: Estimativa de Funcionários (se for 0)
+    if lead.get('funcionarios_estimados', 0) == 0 and hectares > 0:
+        fator = 350 # Padrão Grãos
+        if culturas_lc is None:
+            culturas_lc = str(lead.get('culturas', [])).lower()
+        if _INTENSIVAS.search(culturas_lc):
+            fator = 150 # Culturas intensivas exigem mais gente
+        
+        lead['funcionarios_estimados'] = math.ceil(hectares / fator)
+        lead['dados_inferidos'] = True # Flag para avisar no front
+
+    # HEURÍSTICA 2: Estimativa de Capital Operacional (se for 0)
+    if lead.get('capital_social_estimado', 0) == 0 and hectares > 0:
+        lead['capital_social_estimado'] = hectares * 2000 # Estimativa conservadora
+        lead['dados_inferidos'] = True
+
+    return lead
+
+# Tabelas de Pontuação (limiares crescentes → pontos; bisect no lugar de if-ladder)
+_CAP_TH = (1_000_000, 10_000_000, 50_000_000, 100_000_000)
+_CAP_PTS = (0, 50, 100, 150, 200)
+_HEC_TH = (500, 3_000, 10_000, 50_000)
+_HEC_PTS = (0, 50, 100, 150, 200)
+_FUNC_TH = (50, 100, 200, 500)
+_FUNC_PTS = (0, 30, 60, 90, 120)
+
+_CULTURA_RE = re.compile(r'cana|semente|algod|café|alho|batata|soja|milho')
+_CULTURA_PTS = {
+    'cana': 150, 'semente': 130, 'algod': 120,
+    'café': 110, 'alho': 110, 'batata': 110,
+    'soja': 80, 'milho': 80,
+}
+
+def lookup_capital(val):
+    return _CAP_PTS[bisect.bisect_right(_CAP_TH, val)]
+
+def lookup_hectares(val):
+    return _HEC_PTS[bisect.bisect_right(_HEC_TH, val)]
+
+_CULTURA_MAX = max(_CULTURA_PTS.values())
+
+@functools.lru_cache(maxsize=1024)
+def _lookup_cultura_str(txt):
+    # Uma passada do regex; para no primeiro termo de pontuação máxima
+    best = 50
+    for m in _CULTURA_RE.finditer(txt):
+        pts = _CULTURA_PTS[m.group()]
+        if pts > best:
+            best = pts
+            if best == _CULTURA_MAX: break
+    return best
+
+def lookup_cultura(txt):
+    # Textos de cultura se repetem muito entre leads: resultado memorizado por string
+    return _lookup_cultura_str(str(txt).lower() if txt else "")
+
+def lookup_funcionarios(val):
+    return _FUNC_PTS[bisect.bisect_right(_FUNC_TH, val)]
+
+_TIER_TH = (251, 501, 751)
+_TIERS = ("BRONZE 🥉", "PRATA 🥈", "OURO 🥇", "DIAMANTE 💎")
+
+def lookup_tier(score):
+    return _TIERS[bisect.bisect_right(_TIER_TH, score)]
+
+def calculate_sas_score(lead):
+    # Texto das culturas em minúsculas uma vez só (heurística + lookup)
+    cultura_lc = ', '.join(lead.get('culturas', [])).lower()
+
+    # Aplica correções antes de calcular
+    lead = heuristic_fill(lead, cultura_lc)
+
+    # Extração
+    capital = lead.get('capital_social_estimado', 0)
+    hectares = lead.get('hectares_total', 0)
+    funcionarios = lead.get('funcionarios_estimados', 0)
+    
+    # Cálculo
+    pilar_musculo = min(lookup_capital(capital) + lookup_hectares(hectares), 400)
+    
+    cultura_pts = _lookup_cultura_str(cultura_lc)
+    vert_pts = 0
+    vert = lead.get('verticalizacao') or {}
+    if vert.get('agroindustria'): vert_pts += 50
+    if vert.get('silos'): vert_pts += 30
+    if vert.get('sementeira'): vert_pts += 30
+    
+    pilar_complexidade = min(cultura_pts + vert_pts, 250)
+    
+    pilar_gente = min(lookup_funcionarios(funcionarios), 200)
+    
+    # Momento: Se tem Fiagro/CRA, ganha pontos de "S.A." (Governança)
+    movimentos = str(lead.get('movimentos_financeiros', '')).lower()
+    pilar_momento = 100 if _GOVERNANCA.search(movimentos) else 60
+
+    sas_final = pilar_musculo + pilar_complexidade + pilar_gente + pilar_momento
+    
+    tier = lookup_tier(sas_final)
+    
+    return {
+        "score": int(sas_final),
+        "tier": tier,
+        "breakdown": {
+            "Músculo": pilar_musculo,
+            "Complexidade": pilar_complexidade,
+            "Gente": pilar_gente,
+            "Momento": pilar_momento
+        }
+    }
+
+# --- VERSÃO EM LOTE (CSV / vários leads de uma vez) ---
+_CAP_TH_NP, _CAP_PTS_NP = np.array(_CAP_TH), np.array(_CAP_PTS)
+_HEC_TH_NP, _HEC_PTS_NP = np.array(_HEC_TH), np.array(_HEC_PTS)
+_FUNC_TH_NP, _FUNC_PTS_NP = np.array(_FUNC_TH), np.array(_FUNC_PTS)
+_TIER_TH_NP, _TIERS_NP = np.array(_TIER_TH), np.array(_TIERS, dtype=object)
+
+# Acima disso compensa o kernel compilado (o JIT tem custo na primeira chamada)
+NUMBA_MIN_ROWS = 5_000
+
+if HAS_NUMBA:
+    @njit(cache=True, inline='always')
+    def _ladder(th, pts, val):
+        k = 0
+        while k < th.shape[0] and val >= th[k]:
+            k += 1
+        return pts[k]
+
+    @njit(parallel=True, cache=True)
+    def _score_kernel(capital, hectares, funcionarios, cultura_pts, vert_pts, gov,
+                      cap_th, cap_pts, hec_th, hec_pts, func_th, func_pts, out):
+        # out[:, 0..3] = musculo, complexidade, gente, momento
+        for i in prange(capital.shape[0]):
+            out[i, 0] = min(_ladder(cap_th, cap_pts, capital[i])
+                            + _ladder(hec_th, hec_pts, hectares[i]), 400)
+            out[i, 1] = min(cultura_pts[i] + vert_pts[i], 250)
+            out[i, 2] = min(_ladder(func_th, func_pts, funcionarios[i]), 200)
+            out[i, 3] = 100 if gov[i] else 60
+
+def _num_col(df, name):
+    if name not in df: return np.zeros(len(df))
+    return pd.to_numeric(df[name], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+def _vert_col(df, flag):
+    if 'verticalizacao' not in df: return np.zeros(len(df), dtype=bool)
+    return np.array([bool(v.get(flag)) if isinstance(v, dict) else False
+                     for v in df['verticalizacao']])
+
+def calculate_sas_score_batch(df):
+    """
+    Mesmo cálculo de calculate_sas_score (inclusive heuristic_fill), vetorizado
+    sobre um DataFrame de leads. Devolve uma cópia com as colunas score, tier,
+    musculo, complexidade, gente, momento e dados_inferidos.
+    """
+    n = len(df)
+    capital = _num_col(df, 'capital_social_estimado')
+    hectares = _num_col(df, 'hectares_total')
+    funcionarios = _num_col(df, 'funcionarios_estimados')
+    culturas = (df['culturas'].map(lambda c: str(c).lower()) if 'culturas' in df
+                else pd.Series([''] * n, index=df.index))
+
+    # Heurísticas (mesmas regras de heuristic_fill)
+    falta_func = (funcionarios == 0) & (hectares > 0)
+    fator = np.where(culturas.str.contains(_INTENSIVAS).to_numpy(), 150, 350)
+    funcionarios = np.where(falta_func, np.ceil(hectares / fator), funcionarios)
+    falta_cap = (capital == 0) & (hectares > 0)
+    capital = np.where(falta_cap, hectares * 2000, capital)
+
+    # Parte textual (cultura, governança) fica em Python, antes da parte numérica
+    cultura_pts = np.fromiter((lookup_cultura(c) for c in culturas), dtype=np.int64, count=n)
+    vert_pts = (50 * _vert_col(df, 'agroindustria') + 30 * _vert_col(df, 'silos')
+                + 30 * _vert_col(df, 'sementeira'))
+    movimentos = (df['movimentos_financeiros'].map(lambda m: str(m).lower()) if 'movimentos_financeiros' in df
+                  else pd.Series([''] * n, index=df.index))
+    gov = movimentos.str.contains(_GOVERNANCA).to_numpy(dtype=bool)
+
+    if HAS_NUMBA and n >= NUMBA_MIN_ROWS:
+        out = np.empty((n, 4), dtype=np.int64)
+        _score_kernel(capital, hectares, funcionarios, cultura_pts, vert_pts.astype(np.int64), gov,
+                      _CAP_TH_NP.astype(float), _CAP_PTS_NP, _HEC_TH_NP.astype(float), _HEC_PTS_NP,
+                      _FUNC_TH_NP.astype(float), _FUNC_PTS_NP, out)
+        musculo, complexidade, gente, momento = out.T
+    else:
+        musculo = np.minimum(
+            _CAP_PTS_NP[np.searchsorted(_CAP_TH_NP, capital, side='right')]
+            + _HEC_PTS_NP[np.searchsorted(_HEC_TH_NP, hectares, side='right')], 400)
+        complexidade = np.minimum(cultura_pts + vert_pts, 250)
+        gente = np.minimum(_FUNC_PTS_NP[np.searchsorted(_FUNC_TH_NP, funcionarios, side='right')], 200)
+        momento = np.where(gov, 100, 60)
+
+    score = (musculo + complexidade + gente + momento).astype(int)
+    return df.assign(
+        score=score,
+        tier=_TIERS_NP[np.searchsorted(_TIER_TH_NP, score, side='right')],
+        musculo=musculo, complexidade=complexidade, gente=gente, momento=momento,
+        dados_inferidos=falta_func | falta_cap,
+    )
+
+# ==============================================================================
+# 4. AGENTES DE INVESTIGAÇÃO (PIPELINE DUPLO)
+# ==============================================================================
+
+@st.cache_resource
+def get_genai_client(api_key):
+    # Um client por API key, reutilizado entre reruns e investigações
+    return genai.Client(api_key=api_key)
+
+@st.cache_resource
+def get_search_tool():
+    return types.Tool(google_search=types.GoogleSearch())
+
+# Coleta/estruturação de dados vai no modelo leve; a narrativa da Sara fica no flash
+MODEL_RECON = 'gemini-2.5-flash-lite'
+MODEL_ANALISE = 'gemini-2.5-flash'
+
+# --- CACHE SEMÂNTICO: "Grupo Bom Futuro" ~ "bom futuro agrícola" ---
+EMBEDDING_MODEL = 'text-embedding-004'
+SEMANTIC_THRESHOLD = 0.92
+
+# --- CACHE EM DISCO: sobrevive a restarts/redeploys (memória → disco → LLM) ---
+DISK_CACHE_DIR = '.scout_cache/brain'
+DISK_CACHE_TTL = 86400
+_SEMANTIC_DISK_PREFIX = 'semantic:'
+
+@st.cache_resource
+def _disk_cache():
+    if not HAS_DISKCACHE: return None
+    try:
+        return diskcache.Cache(DISK_CACHE_DIR, size_limit=int(1e9))
+    except Exception:
+        return None
+
+def _result_disk_key(query_key):
+    return 'result:' + hashlib.blake2b(query_key.encode(), digest_size=16).hexdigest()
+
+# Palavras que não identificam a empresa: ficam fora da checagem lexical
+_TOKENS_GENERICOS = frozenset((
+    'grupo', 'fazenda', 'fazendas', 'agro', 'agricola', 'agropecuaria', 'agroindustrial',
+    'ltda', 'sa', 's/a', 'eireli', 'me', 'cia', 'de', 'da', 'do', 'das', 'dos', 'e',
+))
+
+def _tokens_distintivos(query_key):
+    return frozenset(query_key.split()) - _TOKENS_GENERICOS
+
+def _mesmos_termos(a, b):
+    # Embedding perto não basta: "fazenda santa maria" ~ "fazenda santa rita"
+    # passam de 0.92. Exige que os termos distintivos de um contenham os do outro.
+    ta, tb = _tokens_distintivos(a), _tokens_distintivos(b)
+    return bool(ta and tb) and (ta <= tb or tb <= ta)
+
+class _SemanticIndex:
+    """
+    Embeddings normalizados numa matriz numpy (uma linha por consulta), compartilhada
+    entre sessões do Streamlit. Cada vetor vai para o disco como uma entrada própria,
+    então gravar uma consulta nova não regrava o índice inteiro.
+    """
+
+    def __init__(self, disk):
+        self._lock = threading.Lock()
+        self._disk = disk
+        self._mat = None    # capacidade dobra quando enche; linhas válidas: [:_n]
+        self._n = 0
+        self._entries = []  # (query_key, query), alinhado com as linhas de _mat
+        self._known = set()
+        if disk is not None:
+            for k in disk.iterkeys():
+                if not (isinstance(k, str) and k.startswith(_SEMANTIC_DISK_PREFIX)): continue
+                item = disk.get(k)
+                if item is None: continue
+                vec, query_key, query = item
+                self._append(np.asarray(vec, dtype=np.float32), query_key, query)
+
+    def _append(self, vec, query_key, query):
+        if self._mat is None:
+            self._mat = np.empty((64, vec.shape[0]), dtype=np.float32)
+        elif self._n == self._mat.shape[0]:
+            # Buffer novo: quem já pegou uma fatia do antigo segue consistente
+            mat = np.empty((2 * self._n, self._mat.shape[1]), dtype=np.float32)
+            mat[:self._n] = self._mat
+            self._mat = mat
+        self._mat[self._n] = vec
+        self._entries.append((query_key, query))
+        self._known.add(query_key)
+        self._n += 1
+
+    def lookup(self, vec, query_key):
+        with self._lock:
+            if not self._n: return None
+            mat, entries = self._mat[:self._n], self._entries
+        sims = mat @ vec
+        for i in np.argsort(-sims):
+            if sims[i] < SEMANTIC_THRESHOLD: break
+            if _mesmos_termos(query_key, entries[i][0]): return entries[i]
+        return None
+
+    def remember(self, vec, query_key, query):
+        with self._lock:
+            if query_key in self._known: return
+            self._append(vec, query_key, query)
+        if self._disk is not None:
+            self._disk.set(_SEMANTIC_DISK_PREFIX + query_key, (vec.tolist(), query_key, query))
+
+@st.cache_resource
+def _semantic_index():
+    return _SemanticIndex(_disk_cache())
+
+def embed_query(client, q):
+    resp = client.models.embed_content(model=EMBEDDING_MODEL, contents=q)
+    vec = np.asarray(resp.embeddings[0].values, dtype=np.float32)
+    norm = float(np.linalg.norm(vec)) or 1.0
+    return vec / norm
+
+# --- RETRY + CIRCUIT BREAKER ---
+CIRCUIT_MAX_FAILURES = 3
+CIRCUIT_COOLDOWN = 60  # segundos com o circuito aberto
+_circuit_failures = 0
+_circuit_open_until = 0.0
+
+class CircuitOpenError(Exception):
+    pass
+
+def _is_transient(exc):
+    # 5xx e 429 (quota) são passageiros; o resto (4xx) não adianta repetir
+    if isinstance(exc, genai_errors.ServerError): return True
+    return isinstance(exc, genai_errors.ClientError) and getattr(exc, 'code', None) == 429
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=0.5, max=4),
+    retry=retry_if_exception(_is_transient),
+    reraise=True,
+)
+def _stream_json_with_retry(client, model, contents, config):
+    # Lê o stream só até o JSON fechar: parse começa antes do fim da geração
+    # e o que vier depois do '}' final (texto de cortesia, fontes) nem é lido.
+    text = ""
+    for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+        piece = chunk.text
+        if not piece: continue
+        text += piece
+        if '}' in piece:
+            candidate = _extract_json_object(text)
+            if candidate:
+                try: return _json_loads(candidate)
+                except ValueError: pass
+    return clean_and_parse_json(text)
+
+def generate_json_guarded(client, model, contents, config):
+    # Depois de N falhas seguidas, para de bater na API por CIRCUIT_COOLDOWN segundos
+    global _circuit_failures, _circuit_open_until
+    if time.monotonic() < _circuit_open_until:
+        raise CircuitOpenError("Gemini indisponível; tentando de novo em instantes.")
+    try:
+        data = _stream_json_with_retry(client, model, contents, config)
+    except Exception as e:
+        if _is_transient(e):
+            _circuit_failures += 1
+            if _circuit_failures >= CIRCUIT_MAX_FAILURES:
+                _circuit_open_until = time.monotonic() + CIRCUIT_COOLDOWN
+                _circuit_failures = 0
+        raise
+    _circuit_failures = 0
+    return data
+
+_SEM_THINKING = types.ThinkingConfig(thinking_budget=0)
+
+def stream_sara_analysis(client, analysis_prompt):
+    # Gera o briefing da Sara em pedaços, à medida que o modelo escreve.
+    # Todo o contexto já está no prompt: sem Google Search e com teto de saída.
+    # No 2.5 Flash o thinking vem ligado e conta no max_output_tokens: desligado
+    # aqui para o teto ficar inteiro para o texto (senão o briefing sai cortado).
+    if time.monotonic() < _circuit_open_until:
+        raise CircuitOpenError("Gemini indisponível; tentando de novo em instantes.")
+    config = types.GenerateContentConfig(
+        system_instruction=SYSTEM_PROMPT_SARA, max_output_tokens=1500, temperature=0.4,
+        thinking_config=_SEM_THINKING)
+    for chunk in client.models.generate_content_stream(
+        model=MODEL_ANALISE, contents=analysis_prompt, config=config
+    ):
+        if chunk.text: yield chunk.text
+
+def normalize_query(q):
+    # "  Grupo  Bom Futuro Agrícola " -> "grupo bom futuro agricola"
+    q = unicodedata.normalize('NFKD', q)
+    q = ''.join(c for c in q if not unicodedata.combining(c))
+    return ' '.join(q.lower().split())
+
+@functools.lru_cache(maxsize=512)
+def _resolve_query(query_key, query, api_key):
+    # Strings idênticas nem chegam a gerar embedding (lru_cache na frente).
+    # Se o embedding falhar a exceção sobe e nada fica memorizado.
+    vec = embed_query(get_genai_client(api_key), query_key)
+    index = _semantic_index()
+    hit = index.lookup(vec, query_key)
+    if hit: return hit
+    index.remember(vec, query_key, query)
+    return query_key, query
+
+class _InvestigacaoFalhou(Exception):
+    # Levanta de dentro do st.cache_data: exceção não fica memorizada
+    def __init__(self, result):
+        super().__init__("Erro na análise.")
+        self.result = result
+
+def investigate_company(query_input, api_key, on_chunk=None):
+    # on_chunk(texto_parcial): recebe o briefing da Sara enquanto é gerado (só em cache miss)
+    # Chave do cache: nome normalizado ("Bom Futuro" == " bom  futuro ")
+    query = query_input.strip()
+    query_key = normalize_query(query)
+
+    # Resultado exato já no disco: dispensa até o embedding
+    disk = _disk_cache()
+    if disk is None or _result_disk_key(query_key) not in disk:
+        # Consultas quase idênticas reaproveitam a investigação já feita
+        try:
+            query_key, query = _resolve_query(query_key, query, api_key)
+        except Exception:
+            pass
+
+    try:
+        return _investigate_cached(query_key, query, api_key, on_chunk)
+    except _InvestigacaoFalhou as e:
+        # Mostra o resultado parcial, mas o próximo clique tenta de novo
+        return e.result
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _investigate_cached(query_key, _query_input, _api_key, _on_chunk=None):
+    # Args com "_" não entram no hash do st.cache_data (a API key fica fora)
+    disk = _disk_cache()
+    disk_key = _result_disk_key(query_key)
+    if disk is not None:
+        result = disk.get(disk_key)
+        if result is not None: return result
+    result, recon_ok = _investigate_uncached(_query_input, _api_key, _on_chunk)
+    # Recon vazio (falha/circuito aberto) ou análise com erro não vai para o
+    # disco nem para a memória: não servir o placeholder por 24h a todo mundo
+    if not recon_ok or result[2][0] == "Erro na análise.":
+        raise _InvestigacaoFalhou(result)
+    if disk is not None:
+        disk.set(disk_key, result, expire=DISK_CACHE_TTL)
+    return result
+
+def _investigate_uncached(query_input, api_key, on_chunk=None):
+    client = get_genai_client(api_key)
+    google_search_tool = get_search_tool()
+    
+    # --- AGENTES 1+2: RECON OPERACIONAL + SNIPER FINANCEIRO (uma única chamada) ---
+    # response_schema não funciona junto com tools, então o formato vai no prompt
+    combined_prompt = f"""
+    ATUE COMO: Investigador Agrícola e Analista de Mercado de Capitais. ALVO: "{query_input}"
+    
+    PARTE A — Estrutura física do Grupo Econômico:
+    1. Área total (Hectares). Se achar números diferentes, pegue o maior/mais recente.
+    2. Culturas (Soja, Milho, Algodão, Cana, HF).
+    3. Infraestrutura (Silos, Sementeiras, Algodoeiras).
+    
+    PARTE B — Vasculhe a web procurando ESPECIFICAMENTE por:
+    1. Emissões de CRA (Certificados de Recebíveis do Agronegócio).
+    2. Fiagro (Fundos de Investimento) que investiram neles (Ex: Suno, XP, Valora).
+    3. Notícias de M&A ou Auditoria.
+    4. Capital Social (Procure em sites como Econodata, Casa dos Dados).
+    
+    Retorne UM ÚNICO JSON:
+    {{
+        "operational": {{
+            "nome_grupo": "Nome",
+            "hectares_total": numero,
+            "culturas": ["lista"],
+            "verticalizacao": {{ "agroindustria": bool, "sementeira": bool, "silos": bool }}
+        }},
+        "financial": {{
+            "capital_social_estimado": numero (somente numeros),
+            "funcionarios_estimados": numero,
+            "movimentos_financeiros": ["Lista de fatos: Ex: Emissão de CRA de R$ 50M", "Fiagro Suno SNFZ11", "Auditoria XYZ"],
+            "resumo_financeiro": "Texto curto sobre a robustez financeira."
+        }}
+    }}
+    Retorne JSON compacto, numa linha só, sem markdown.
+    Comece com {{ e termine com }}.
+    """
+    
+    try:
+        parsed = generate_json_guarded(
+            client, MODEL_RECON, combined_prompt,
+            types.GenerateContentConfig(
+                tools=[google_search_tool], temperature=0.1,
+                max_output_tokens=1600, candidate_count=1,
+            )
+        ) or {}
+    except Exception:
+        parsed = {}
+
+    # Sem o bloco operacional o resto é placeholder: o chamador não persiste
+    recon_ok = isinstance(parsed, dict) and bool(parsed.get('operational'))
+    if not isinstance(parsed, dict): parsed = {}
+    data_ops = parsed.get('operational') or {"nome_grupo": query_input, "hectares_total": 0}
+    data_fin = parsed.get('financial') or {}
+
+    # --- FUSÃO DE DADOS ---
+    final_data = {**data_ops, **data_fin}
+    
+    if 'resumo_operacao' not in final_data:
+        final_data['resumo_operacao'] = f"Grupo com {final_data.get('hectares_total', '?')} ha. {final_data.get('resumo_financeiro', '')}"
+
+    # --- CÁLCULO E ANÁLISE ---
+    score_result = calculate_sas_score(final_data)
+    
+    analysis_prompt = f"""
+    CONTEXTO COMPLETO: {_json_dumps(final_data)}
+    SCORE: {score_result['score']} ({score_result['tier']})
+    """
+    
+    try:
+        full_text = ""
+        for piece in stream_sara_analysis(client, analysis_prompt):
+            full_text += piece
+            if on_chunk: on_chunk(full_text)
+    except:
+        full_text = "Erro na análise."
+    if not full_text: full_text = "Erro na análise."
+
+    sections = full_text.split('|||')
+    if len(sections) < 2: sections = [full_text, "", "", ""]
+        
+    return (final_data, score_result, sections), recon_ok
@@ -5,11 +5,13 @@ Consulta CNPJ com cache, retry automático e fallback.
 """
 import re
 import requests
+import sys
 import time
 from typing import Optional
+from requests.adapters import HTTPAdapter
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
-from scout_types import DadosCNPJ
+from scout_types import DadosCNPJ, QSAColumns
 from services import cache
 
 
@@ -17,9 +19,17 @@ from services import cache
 # HELPERS
 # =============================================================================
 
+_NAO_DIGITO = re.compile(r'\D')
+
+
 def limpar_cnpj(cnpj: str) -> str:
     """Remove formatação do CNPJ."""
-    return re.sub(r'\D', '', cnpj.strip())
+    return _NAO_DIGITO.sub('', cnpj)
+
+
+def _categoria(valor) -> str:
+    """Interna campos categóricos (UF, porte, situação, CNAE...) repetidos entre empresas."""
+    return sys.intern(str(valor or ""))
 
 
 def formatar_cnpj(cnpj: str) -> str:
@@ -30,14 +40,40 @@ def formatar_cnpj(cnpj: str) -> str:
     return cnpj
 
 
+# Pesos dos dígitos verificadores (módulo 11)
+_PESOS_DV1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_DV2 = (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def _digitos_verificadores_ok(digitos: str) -> bool:
+    """Confere os dois DVs de um CNPJ já limpo com 14 dígitos."""
+    nums = [int(c) for c in digitos]
+    resto = sum(n * p for n, p in zip(nums, _PESOS_DV1)) % 11
+    if nums[12] != (0 if resto < 2 else 11 - resto):
+        return False
+    resto = sum(n * p for n, p in zip(nums, _PESOS_DV2)) % 11
+    return nums[13] == (0 if resto < 2 else 11 - resto)
+
+
 def validar_cnpj(cnpj: str) -> bool:
-    """Validação básica de CNPJ (tamanho + não tudo igual)."""
+    """Validação completa de CNPJ (tamanho, não tudo igual e dígitos verificadores)."""
     cnpj = limpar_cnpj(cnpj)
     if len(cnpj) != 14:
         return False
     if cnpj == cnpj[0] * 14:
         return False
-    return True
+    return _digitos_verificadores_ok(cnpj)
+
+
+def validar_e_formatar_cnpj(cnpj: str) -> tuple[bool, str]:
+    """
+    Limpa, valida e formata em uma única passada (uso por keystroke na UI).
+    Retorna (valido, cnpj_formatado_ou_limpo).
+    """
+    digitos = limpar_cnpj(cnpj)
+    if len(digitos) != 14 or digitos == digitos[0] * 14 or not _digitos_verificadores_ok(digitos):
+        return False, digitos
+    return True, f"{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}"
 
 
 # =============================================================================
@@ -48,6 +84,12 @@ class CNPJServiceError(Exception):
     pass
 
 
+# Sessão compartilhada: retries e consultas em sequência reaproveitam a
+# conexão TLS em vez de abrir uma nova a cada chamada. O retry fica com o tenacity.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=0))
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
@@ -56,7 +98,7 @@ class CNPJServiceError(Exception):
 def _consultar_brasilapi(cnpj: str) -> dict:
     """Consulta a BrasilAPI com retry automático."""
     url = f"https://brasilapi.com.br/api/cnpj/v1/{cnpj}"
-    resp = requests.get(url, timeout=15)
+    resp = _SESSION.get(url, timeout=15)
     
     if resp.status_code == 200:
         return resp.json()
@@ -77,7 +119,7 @@ def _consultar_brasilapi(cnpj: str) -> dict:
 def _consultar_receitaws(cnpj: str) -> dict:
     """Fallback: ReceitaWS."""
     url = f"https://receitaws.com.br/v1/cnpj/{cnpj}"
-    resp = requests.get(url, timeout=15, headers={"Accept": "application/json"})
+    resp = _SESSION.get(url, timeout=15, headers={"Accept": "application/json"})
     
     if resp.status_code == 200:
         data = resp.json()
@@ -91,37 +133,39 @@ def _consultar_receitaws(cnpj: str) -> dict:
 # SERVIÇO PRINCIPAL
 # =============================================================================
 
+# Namespace versionado: entradas antigas guardavam o QSA como lista de dicts
+_CACHE_NS = "cnpj_v2"
+
 def _parse_brasilapi_response(data: dict) -> DadosCNPJ:
     """Converte resposta da BrasilAPI para DadosCNPJ."""
-    qsa = []
+    qsa = QSAColumns()
     for socio in data.get("qsa", []):
-        qsa.append({
-            "nome": socio.get("nome_socio", ""),
-            "qualificacao": socio.get("qualificacao_socio", ""),
-            "data_entrada": socio.get("data_entrada_sociedade", ""),
-            "cpf_cnpj": socio.get("cnpj_cpf_do_socio", ""),
-            "faixa_etaria": socio.get("faixa_etaria", ""),
-        })
+        qsa.nome.append(socio.get("nome_socio", ""))
+        qsa.qualificacao.append(socio.get("qualificacao_socio", ""))
+        qsa.data_entrada.append(socio.get("data_entrada_sociedade", ""))
+        qsa.cpf_cnpj.append(socio.get("cnpj_cpf_do_socio", ""))
+        qsa.faixa_etaria.append(socio.get("faixa_etaria", ""))
     
-    cnaes_sec = []
-    for cnae in data.get("cnaes_secundarios", []):
-        if cnae.get("codigo"):
-            cnaes_sec.append(f"{cnae['codigo']} - {cnae.get('descricao', '')}")
+    cnaes_sec = tuple(
+        f"{cnae['codigo']} - {cnae.get('descricao', '')}"
+        for cnae in data.get("cnaes_secundarios", [])
+        if cnae.get("codigo")
+    )
     
     return DadosCNPJ(
         cnpj=data.get("cnpj", ""),
         razao_social=data.get("razao_social", ""),
         nome_fantasia=data.get("nome_fantasia", ""),
-        situacao_cadastral=data.get("descricao_situacao_cadastral", ""),
+        situacao_cadastral=_categoria(data.get("descricao_situacao_cadastral")),
         data_abertura=data.get("data_inicio_atividade", ""),
-        natureza_juridica=data.get("descricao_natureza_juridica", ""),
+        natureza_juridica=_categoria(data.get("descricao_natureza_juridica")),
         capital_social=float(data.get("capital_social", 0)),
-        porte=data.get("descricao_porte", ""),
-        cnae_principal=str(data.get("cnae_fiscal", "")),
+        porte=_categoria(data.get("descricao_porte")),
+        cnae_principal=_categoria(data.get("cnae_fiscal")),
         cnae_descricao=data.get("cnae_fiscal_descricao", ""),
         cnaes_secundarios=cnaes_sec,
-        municipio=data.get("municipio", ""),
-        uf=data.get("uf", ""),
+        municipio=_categoria(data.get("municipio")),
+        uf=_categoria(data.get("uf")),
         cep=data.get("cep", ""),
         logradouro=data.get("logradouro", ""),
         numero=data.get("numero", ""),
@@ -131,7 +175,7 @@ def _parse_brasilapi_response(data: dict) -> DadosCNPJ:
         email=data.get("email", ""),
         qsa=qsa,
         fonte="brasilapi",
-        timestamp=str(time.time()),
+        timestamp=int(time.time()),
     )
 
 
@@ -146,7 +190,7 @@ def consultar_cnpj(cnpj: str) -> Optional[DadosCNPJ]:
         return None
     
     # Check cache
-    cached = cache.get("cnpj", {"cnpj": cnpj_limpo})
+    cached = cache.get(_CACHE_NS, {"cnpj": cnpj_limpo})
     if cached is not None:
         return cached
     
@@ -154,7 +198,7 @@ def consultar_cnpj(cnpj: str) -> Optional[DadosCNPJ]:
     try:
         raw = _consultar_brasilapi(cnpj_limpo)
         resultado = _parse_brasilapi_response(raw)
-        cache.set("cnpj", {"cnpj": cnpj_limpo}, resultado, ttl=86400)  # 24h
+        cache.set(_CACHE_NS, {"cnpj": cnpj_limpo}, resultado, ttl=86400)  # 24h
         return resultado
     except Exception:
         pass
@@ -167,16 +211,16 @@ def consultar_cnpj(cnpj: str) -> Optional[DadosCNPJ]:
             cnpj=cnpj_limpo,
             razao_social=raw.get("nome", ""),
             nome_fantasia=raw.get("fantasia", ""),
-            situacao_cadastral=raw.get("situacao", ""),
+            situacao_cadastral=_categoria(raw.get("situacao")),
             capital_social=float(str(raw.get("capital_social", "0")).replace(".", "").replace(",", ".")),
-            cnae_principal=raw.get("atividade_principal", [{}])[0].get("code", ""),
+            cnae_principal=_categoria(raw.get("atividade_principal", [{}])[0].get("code")),
             cnae_descricao=raw.get("atividade_principal", [{}])[0].get("text", ""),
-            municipio=raw.get("municipio", ""),
-            uf=raw.get("uf", ""),
+            municipio=_categoria(raw.get("municipio")),
+            uf=_categoria(raw.get("uf")),
             fonte="receitaws",
-            timestamp=str(time.time()),
+            timestamp=int(time.time()),
         )
-        cache.set("cnpj", {"cnpj": cnpj_limpo}, resultado, ttl=86400)
+        cache.set(_CACHE_NS, {"cnpj": cnpj_limpo}, resultado, ttl=86400)
         return resultado
     except Exception:
         return None
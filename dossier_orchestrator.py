@@ -4,21 +4,25 @@ Equivalente ao dossierOrchestrator.ts.
 Pipeline de 6 passos para gerar um dossiê completo.
 """
 import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Callable
-from google import genai
 
 from scout_types import (
-    DossieCompleto, DadosCNPJ, DadosOperacionais, DadosFinanceiros,
+    DossieCompleto, DadosCNPJ, EMPTY_CNPJ, DadosOperacionais, DadosFinanceiros,
     IntelMercado, SecaoAnalise, Verticalizacao, SASResult,
 )
 from services.gemini_service import (
     agent_recon_operacional,
     agent_sniper_financeiro,
     agent_intel_mercado,
+    agent_recon_full,
     agent_analise_estrategica,
     agent_auditor_qualidade,
     buscar_cnpj_por_nome,
+    criar_client,
+    _fast_dumps,
 )
 from services.cnpj_service import consultar_cnpj, limpar_cnpj, validar_cnpj
 from services.market_estimator import calcular_sas
@@ -26,85 +30,117 @@ from services.quality_gate import executar_quality_gate
 from utils.market_intelligence import enriquecer_prompt_com_contexto
 
 
+# Passos 2-4 numa única chamada (agent_recon_full). SCOUT_AGENTE_UNIFICADO=0
+# volta aos três agentes separados (em paralelo) para comparação A/B.
+AGENTE_UNIFICADO = os.environ.get("SCOUT_AGENTE_UNIFICADO", "1") != "0"
+
+# Sem CNPJ informado, SCOUT_UNIFICADO_ANTECIPADO=1 dispara o agente unificado
+# junto com a Busca Mágica em vez de esperar por ela. Ganha a latência da
+# busca, mas o Intel perde o contexto de setor: o CNAE/UF que a busca achar
+# chega tarde e o prompt sai com o contexto genérico (generico_agro, UF não
+# identificada). Desligado por padrão.
+UNIFICADO_ANTECIPADO = os.environ.get("SCOUT_UNIFICADO_ANTECIPADO", "0") == "1"
+
+
 # =============================================================================
 # HELPERS
 # =============================================================================
 
+def _coerce(raw: dict, key: str, typ: type, default):
+    """
+    Lê raw[key] convertendo para typ. Só cai no default quando o campo falta,
+    é None ou não converte — 0, 0.0 e [] vindos do agente são preservados.
+    typ=tuple congela a lista do JSON (campos só lidos depois do parse).
+    """
+    v = raw.get(key)
+    if v is None:
+        return default
+    if isinstance(v, typ):
+        return v
+    if typ is tuple and isinstance(v, list):
+        return tuple(v)
+    if typ is list or typ is tuple:  # string/dict no lugar de lista: descarta em vez de fatiar
+        return default
+    try:
+        return typ(v)
+    except (TypeError, ValueError):
+        return default
+
+
 def _parse_operacional(raw: dict) -> DadosOperacionais:
     """Converte dict bruto do agente em DadosOperacionais tipado."""
-    vert_raw = raw.get('verticalizacao', {})
+    vert_raw = _coerce(raw, 'verticalizacao', dict, {})
     vert = Verticalizacao(
-        agroindustria=vert_raw.get('agroindustria', False),
-        sementeira=vert_raw.get('sementeira', False),
-        silos=vert_raw.get('silos', False),
-        algodoeira=vert_raw.get('algodoeira', False),
-        usina=vert_raw.get('usina', False),
-        frigorifico=vert_raw.get('frigorifico', False),
-        fabrica_racao=vert_raw.get('fabrica_racao', False),
+        agroindustria=_coerce(vert_raw, 'agroindustria', bool, False),
+        sementeira=_coerce(vert_raw, 'sementeira', bool, False),
+        silos=_coerce(vert_raw, 'silos', bool, False),
+        algodoeira=_coerce(vert_raw, 'algodoeira', bool, False),
+        usina=_coerce(vert_raw, 'usina', bool, False),
+        frigorifico=_coerce(vert_raw, 'frigorifico', bool, False),
+        fabrica_racao=_coerce(vert_raw, 'fabrica_racao', bool, False),
     )
     
     return DadosOperacionais(
-        nome_grupo=raw.get('nome_grupo', ''),
-        hectares_total=int(raw.get('hectares_total', 0) or 0),
-        culturas=raw.get('culturas', []) or [],
+        nome_grupo=_coerce(raw, 'nome_grupo', str, ''),
+        hectares_total=_coerce(raw, 'hectares_total', int, 0),
+        culturas=_coerce(raw, 'culturas', tuple, ()),
         verticalizacao=vert,
-        regioes_atuacao=raw.get('regioes_atuacao', []) or [],
-        numero_fazendas=int(raw.get('numero_fazendas', 0) or 0),
-        tecnologias_identificadas=raw.get('tecnologias_identificadas', []) or [],
-        confianca=float(raw.get('confianca', 0) or 0),
+        regioes_atuacao=_coerce(raw, 'regioes_atuacao', tuple, ()),
+        numero_fazendas=_coerce(raw, 'numero_fazendas', int, 0),
+        tecnologias_identificadas=_coerce(raw, 'tecnologias_identificadas', tuple, ()),
+        confianca=_coerce(raw, 'confianca', float, 0.0),
     )
 
 
 def _parse_financeiro(raw: dict) -> DadosFinanceiros:
     """Converte dict bruto do agente em DadosFinanceiros tipado."""
     return DadosFinanceiros(
-        capital_social_estimado=float(raw.get('capital_social_estimado', 0) or 0),
-        funcionarios_estimados=int(raw.get('funcionarios_estimados', 0) or 0),
-        faturamento_estimado=float(raw.get('faturamento_estimado', 0) or 0),
-        movimentos_financeiros=raw.get('movimentos_financeiros', []) or [],
-        fiagros_relacionados=raw.get('fiagros_relacionados', []) or [],
-        cras_emitidos=raw.get('cras_emitidos', []) or [],
-        parceiros_financeiros=raw.get('parceiros_financeiros', []) or [],
-        auditorias=raw.get('auditorias', []) or [],
-        governanca_corporativa=bool(raw.get('governanca_corporativa', False)),
-        resumo_financeiro=raw.get('resumo_financeiro', ''),
-        confianca=float(raw.get('confianca', 0) or 0),
+        capital_social_estimado=_coerce(raw, 'capital_social_estimado', float, 0.0),
+        funcionarios_estimados=_coerce(raw, 'funcionarios_estimados', int, 0),
+        faturamento_estimado=_coerce(raw, 'faturamento_estimado', float, 0.0),
+        movimentos_financeiros=_coerce(raw, 'movimentos_financeiros', tuple, ()),
+        fiagros_relacionados=_coerce(raw, 'fiagros_relacionados', tuple, ()),
+        cras_emitidos=_coerce(raw, 'cras_emitidos', tuple, ()),
+        parceiros_financeiros=_coerce(raw, 'parceiros_financeiros', tuple, ()),
+        auditorias=_coerce(raw, 'auditorias', tuple, ()),
+        governanca_corporativa=_coerce(raw, 'governanca_corporativa', bool, False),
+        resumo_financeiro=_coerce(raw, 'resumo_financeiro', str, ''),
+        confianca=_coerce(raw, 'confianca', float, 0.0),
     )
 
 
 def _parse_intel(raw: dict) -> IntelMercado:
     """Converte dict bruto do agente em IntelMercado tipado."""
     return IntelMercado(
-        noticias_recentes=raw.get('noticias_recentes', []) or [],
-        concorrentes=raw.get('concorrentes', []) or [],
-        tendencias_setor=raw.get('tendencias_setor', []) or [],
-        dores_identificadas=raw.get('dores_identificadas', []) or [],
-        oportunidades=raw.get('oportunidades', []) or [],
-        sinais_compra=raw.get('sinais_compra', []) or [],
-        riscos=raw.get('riscos', []) or [],
-        confianca=float(raw.get('confianca', 0) or 0),
+        noticias_recentes=_coerce(raw, 'noticias_recentes', list, []),
+        concorrentes=_coerce(raw, 'concorrentes', list, []),
+        tendencias_setor=_coerce(raw, 'tendencias_setor', list, []),
+        dores_identificadas=_coerce(raw, 'dores_identificadas', list, []),
+        oportunidades=_coerce(raw, 'oportunidades', list, []),
+        sinais_compra=_coerce(raw, 'sinais_compra', list, []),
+        riscos=_coerce(raw, 'riscos', list, []),
+        confianca=_coerce(raw, 'confianca', float, 0.0),
     )
 
 
+_SECAO_TITULOS = (
+    ("🏢", "Perfil e Mercado"),
+    ("🚜", "Complexidade e Dores"),
+    ("💡", "Fit Senior (O Pitch)"),
+    ("⚔️", "Plano de Ataque"),
+)
+
+
 def _parse_secoes(texto: str) -> list[SecaoAnalise]:
-    """Divide a análise em seções usando |||."""
-    TITULOS = [
-        ("🏢", "Perfil e Mercado"),
-        ("🚜", "Complexidade e Dores"),
-        ("💡", "Fit Senior (O Pitch)"),
-        ("⚔️", "Plano de Ataque"),
-    ]
-    
-    partes = texto.split('|||')
+    """Divide a análise em seções usando ||| (o que vier após a 4ª vira uma seção extra)."""
     secoes = []
     
-    for i, parte in enumerate(partes):
-        parte = parte.strip()
-        if not parte:
+    for i, parte in enumerate(texto.split('|||', len(_SECAO_TITULOS))):
+        if not (parte := parte.strip()):
             continue
         
-        if i < len(TITULOS):
-            icone, titulo = TITULOS[i]
+        if i < len(_SECAO_TITULOS):
+            icone, titulo = _SECAO_TITULOS[i]
         else:
             icone, titulo = "📄", f"Seção {i+1}"
         
@@ -125,6 +161,18 @@ def _parse_secoes(texto: str) -> list[SecaoAnalise]:
     return secoes
 
 
+def _contexto_setor(dossie: DossieCompleto) -> str:
+    """Contexto estático de CNAE/UF para o agente de Intel de Mercado."""
+    cnae = ""
+    uf = ""
+    if dossie.dados_cnpj is not EMPTY_CNPJ:
+        cnae = dossie.dados_cnpj.cnae_principal
+        uf = dossie.dados_cnpj.uf
+    elif dossie.dados_operacionais.regioes_atuacao:
+        uf = dossie.dados_operacionais.regioes_atuacao[0]
+    return enriquecer_prompt_com_contexto(cnae, uf)
+
+
 # =============================================================================
 # PIPELINE PRINCIPAL
 # =============================================================================
@@ -135,6 +183,8 @@ def gerar_dossie_completo(
     cnpj: str = "",
     log_callback: Optional[Callable[[str], None]] = None,
     progress_callback: Optional[Callable[[float, str], None]] = None,
+    stream_callback: Optional[Callable[[str], None]] = None,
+    batch_mode: bool = False,
 ) -> DossieCompleto:
     """
     Pipeline de 6 passos para gerar um dossiê completo.
@@ -145,9 +195,13 @@ def gerar_dossie_completo(
     Passo 4: Intel de Mercado (Flash + Search)
     Passo 5: Análise Estratégica (Pro — Deep Thinking)
     Passo 6: Quality Gate (Determinístico + Pro)
+    
+    Com AGENTE_UNIFICADO (padrão), os Passos 2-4 saem de uma única chamada.
+    `stream_callback` recebe o texto parcial da análise (Passo 5) em streaming.
+    `batch_mode` (geração sem UI esperando) manda a auditoria IA pela Batch API.
     """
     start_time = time.time()
-    client = genai.Client(api_key=api_key)
+    client = criar_client(api_key)
     
     dossie = DossieCompleto(empresa_alvo=empresa_alvo, cnpj=cnpj)
     
@@ -160,86 +214,108 @@ def gerar_dossie_completo(
         if progress_callback:
             progress_callback(pct, msg)
     
-    # =========================================================================
-    # PASSO 1: CONSULTA CNPJ
-    # =========================================================================
-    _progress(0.05, "🔍 Passo 1/6: Consultando CNPJ...")
-    _log("Passo 1: Consulta CNPJ")
-    
-    if cnpj and validar_cnpj(limpar_cnpj(cnpj)):
-        dados_cnpj = consultar_cnpj(cnpj)
-        if dados_cnpj:
-            dossie.dados_cnpj = dados_cnpj
-            dossie.cnpj = cnpj
-            _log(f"  ✅ CNPJ encontrado: {dados_cnpj.razao_social}")
-        else:
-            _log(f"  ⚠️ CNPJ {cnpj} não encontrado na BrasilAPI")
-    else:
-        # Busca mágica: tenta encontrar CNPJ pelo nome
-        _log("  🔮 Tentando Busca Mágica de CNPJ...")
-        cnpj_encontrado = buscar_cnpj_por_nome(client, empresa_alvo)
-        if cnpj_encontrado:
-            _log(f"  ✅ CNPJ encontrado via IA: {cnpj_encontrado}")
-            dados_cnpj = consultar_cnpj(cnpj_encontrado)
+    # Passos 1-4 se sobrepõem: as chamadas de rede rodam no pool e a thread
+    # principal só coleta os resultados (logs e progresso ficam nela, pois os
+    # callbacks mexem na UI). O request_queue segue arbitrando o RPM.
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        # Recon não depende do CNPJ: dispara já, em paralelo com o Passo 1
+        fut_recon = None
+        fut_full = None
+        cnpj_informado = bool(cnpj) and validar_cnpj(limpar_cnpj(cnpj))
+        if not AGENTE_UNIFICADO:
+            fut_recon = pool.submit(agent_recon_operacional, client, empresa_alvo)
+        elif not cnpj_informado and UNIFICADO_ANTECIPADO:
+            # Não espera a Busca Mágica: o dossiê ainda está vazio, então o Intel
+            # recebe o contexto genérico (ver UNIFICADO_ANTECIPADO)
+            fut_full = pool.submit(agent_recon_full, client, empresa_alvo, _contexto_setor(dossie))
+        
+        # =====================================================================
+        # PASSO 1: CONSULTA CNPJ
+        # =====================================================================
+        _progress(0.05, "🔍 Passo 1/6: Consultando CNPJ...")
+        _log("Passo 1: Consulta CNPJ")
+        
+        if cnpj_informado:
+            dados_cnpj = consultar_cnpj(cnpj)
             if dados_cnpj:
                 dossie.dados_cnpj = dados_cnpj
-                dossie.cnpj = cnpj_encontrado
+                dossie.cnpj = cnpj
+                _log(f"  ✅ CNPJ encontrado: {dados_cnpj.razao_social}")
+            else:
+                _log(f"  ⚠️ CNPJ {cnpj} não encontrado na BrasilAPI")
         else:
-            _log("  ℹ️ CNPJ não encontrado — continuando sem dados cadastrais")
-    
-    # =========================================================================
-    # PASSO 2: RECON OPERACIONAL
-    # =========================================================================
-    _progress(0.20, "🛰️ Passo 2/6: Reconhecimento Operacional...")
-    _log("Passo 2: Agente Recon Operacional (Flash + Search)")
-    
-    raw_ops = agent_recon_operacional(client, empresa_alvo)
-    dossie.dados_operacionais = _parse_operacional(raw_ops)
-    
-    nome_grupo = dossie.dados_operacionais.nome_grupo or empresa_alvo
-    _log(f"  ✅ Grupo: {nome_grupo} | {dossie.dados_operacionais.hectares_total:,} ha | "
-         f"Culturas: {', '.join(dossie.dados_operacionais.culturas)} | "
-         f"Confiança: {dossie.dados_operacionais.confianca:.0%}")
-    
-    # =========================================================================
-    # PASSO 3: SNIPER FINANCEIRO
-    # =========================================================================
-    _progress(0.40, "💰 Passo 3/6: Deep Dive Financeiro...")
-    _log("Passo 3: Agente Sniper Financeiro (Flash + Search)")
-    
-    raw_fin = agent_sniper_financeiro(client, empresa_alvo, nome_grupo)
-    dossie.dados_financeiros = _parse_financeiro(raw_fin)
-    
-    n_mov = len(dossie.dados_financeiros.movimentos_financeiros)
-    n_fiagro = len(dossie.dados_financeiros.fiagros_relacionados)
-    _log(f"  ✅ {n_mov} movimentos financeiros | {n_fiagro} Fiagros | "
-         f"Capital: R${dossie.dados_financeiros.capital_social_estimado/1e6:.1f}M | "
-         f"Confiança: {dossie.dados_financeiros.confianca:.0%}")
-    
-    # =========================================================================
-    # PASSO 4: INTEL DE MERCADO
-    # =========================================================================
-    _progress(0.55, "📡 Passo 4/6: Inteligência de Mercado...")
-    _log("Passo 4: Agente Intel de Mercado (Flash + Search)")
-    
-    # Enriquece com contexto estático
-    cnae = ""
-    uf = ""
-    if dossie.dados_cnpj:
-        cnae = dossie.dados_cnpj.cnae_principal
-        uf = dossie.dados_cnpj.uf
-    elif dossie.dados_operacionais.regioes_atuacao:
-        uf = dossie.dados_operacionais.regioes_atuacao[0]
-    
-    contexto_setor = enriquecer_prompt_com_contexto(cnae, uf)
-    
-    raw_intel = agent_intel_mercado(client, empresa_alvo, contexto_setor)
-    dossie.intel_mercado = _parse_intel(raw_intel)
-    
-    n_noticias = len(dossie.intel_mercado.noticias_recentes)
-    n_sinais = len(dossie.intel_mercado.sinais_compra)
-    _log(f"  ✅ {n_noticias} notícias | {n_sinais} sinais de compra | "
-         f"Confiança: {dossie.intel_mercado.confianca:.0%}")
+            # Busca mágica: tenta encontrar CNPJ pelo nome
+            _log("  🔮 Tentando Busca Mágica de CNPJ...")
+            cnpj_encontrado = buscar_cnpj_por_nome(client, empresa_alvo)
+            if cnpj_encontrado:
+                _log(f"  ✅ CNPJ encontrado via IA: {cnpj_encontrado}")
+                dados_cnpj = consultar_cnpj(cnpj_encontrado)
+                if dados_cnpj:
+                    dossie.dados_cnpj = dados_cnpj
+                    dossie.cnpj = cnpj_encontrado
+            else:
+                _log("  ℹ️ CNPJ não encontrado — continuando sem dados cadastrais")
+        
+        # Com CNPJ, o contexto de setor já está definido: Intel pode sair agora
+        fut_intel = None
+        raw_full = None
+        if fut_full is not None:
+            raw_full = fut_full.result()
+        elif AGENTE_UNIFICADO:
+            # Passo 1 concluído (BrasilAPI ou Busca Mágica): contexto com o CNAE/UF achado
+            raw_full = agent_recon_full(client, empresa_alvo, _contexto_setor(dossie))
+        elif dossie.dados_cnpj is not EMPTY_CNPJ:
+            fut_intel = pool.submit(agent_intel_mercado, client, empresa_alvo, _contexto_setor(dossie))
+        
+        # =====================================================================
+        # PASSO 2: RECON OPERACIONAL
+        # =====================================================================
+        _progress(0.20, "🛰️ Passo 2/6: Reconhecimento Operacional...")
+        _log("Passo 2: Agente Recon Operacional (Flash + Search)")
+        
+        raw_ops = raw_full["operacional"] if raw_full else fut_recon.result()
+        dossie.dados_operacionais = _parse_operacional(raw_ops)
+        
+        nome_grupo = dossie.dados_operacionais.nome_grupo or empresa_alvo
+        _log(f"  ✅ Grupo: {nome_grupo} | {dossie.dados_operacionais.hectares_total:,} ha | "
+             f"Culturas: {', '.join(dossie.dados_operacionais.culturas)} | "
+             f"Confiança: {dossie.dados_operacionais.confianca:.0%}")
+        
+        # Sniper precisa do nome_grupo; Intel (sem CNPJ) precisa das regiões do Recon
+        fut_fin = None
+        if not raw_full:
+            fut_fin = pool.submit(agent_sniper_financeiro, client, empresa_alvo, nome_grupo)
+        if not raw_full and fut_intel is None:
+            fut_intel = pool.submit(agent_intel_mercado, client, empresa_alvo, _contexto_setor(dossie))
+        
+        # =====================================================================
+        # PASSO 3: SNIPER FINANCEIRO
+        # =====================================================================
+        _progress(0.40, "💰 Passo 3/6: Deep Dive Financeiro...")
+        _log("Passo 3: Agente Sniper Financeiro (Flash + Search)")
+        
+        raw_fin = raw_full["financeiro"] if raw_full else fut_fin.result()
+        dossie.dados_financeiros = _parse_financeiro(raw_fin)
+        
+        n_mov = len(dossie.dados_financeiros.movimentos_financeiros)
+        n_fiagro = len(dossie.dados_financeiros.fiagros_relacionados)
+        _log(f"  ✅ {n_mov} movimentos financeiros | {n_fiagro} Fiagros | "
+             f"Capital: R${dossie.dados_financeiros.capital_social_estimado/1e6:.1f}M | "
+             f"Confiança: {dossie.dados_financeiros.confianca:.0%}")
+        
+        # =====================================================================
+        # PASSO 4: INTEL DE MERCADO
+        # =====================================================================
+        _progress(0.55, "📡 Passo 4/6: Inteligência de Mercado...")
+        _log("Passo 4: Agente Intel de Mercado (Flash + Search)")
+        
+        raw_intel = raw_full["intel"] if raw_full else fut_intel.result()
+        dossie.intel_mercado = _parse_intel(raw_intel)
+        
+        n_noticias = len(dossie.intel_mercado.noticias_recentes)
+        n_sinais = len(dossie.intel_mercado.sinais_compra)
+        _log(f"  ✅ {n_noticias} notícias | {n_sinais} sinais de compra | "
+             f"Confiança: {dossie.intel_mercado.confianca:.0%}")
     
     # =========================================================================
     # PASSO 4.5: CÁLCULO DO SCORE SAS 4.0
@@ -247,6 +323,8 @@ def gerar_dossie_completo(
     _progress(0.65, "📊 Calculando Score SAS 4.0...")
     _log("Passo 4.5: Cálculo do Score SAS 4.0")
     
+    # Fundido uma única vez: o mesmo dict (já com as heurísticas do SAS) é a
+    # base do prompt do Passo 5 — não chame merge_dados de novo depois daqui
     dados_merged = dossie.merge_dados()
     dossie.sas_result = calcular_sas(dados_merged)
     
@@ -277,8 +355,15 @@ def gerar_dossie_completo(
         'breakdown': dossie.sas_result.breakdown.to_dict(),
     }
     
+    # Contexto com o que se sabe agora (CNPJ da Busca Mágica ou regiões do Recon)
+    contexto_setor = _contexto_setor(dossie)
+    
+    # Serializado uma vez (compacto): o mesmo JSON vai para a análise e para o auditor
+    dados_json = _fast_dumps(dados_para_analise, indent=False)
+    
     texto_analise = agent_analise_estrategica(
-        client, dados_para_analise, sas_dict, contexto_setor,
+        client, dados_json, sas_dict, contexto_setor,
+        on_chunk=stream_callback,
     )
     
     dossie.analise_bruta = texto_analise
@@ -302,7 +387,7 @@ def gerar_dossie_completo(
     
     # Auditoria por IA (Pro) — opcional, adiciona profundidade
     try:
-        audit_ia = agent_auditor_qualidade(client, texto_analise, dados_para_analise)
+        audit_ia = agent_auditor_qualidade(client, texto_analise, dados_json, batch=batch_mode)
         dossie.quality_report.recomendacoes.extend(
             audit_ia.get('recomendacoes', [])
         )
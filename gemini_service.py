@@ -6,12 +6,31 @@ Usa modelo certo para cada tarefa:
   - Flash: busca rápida com Google Search
   - Pro: raciocínio profundo, análise estratégica, auditoria
 """
+import hashlib
 import json
 import re
+import threading
 import time
-from typing import Optional, Any
+from concurrent.futures import Future
+from dataclasses import asdict, is_dataclass
+from functools import lru_cache
+from typing import Optional, Any, Callable, Literal
 from google import genai
 from google.genai import types
+from pydantic import BaseModel
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import h2  # noqa: F401 — só habilita o http2 do httpx
+    import httpx
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
 
 from services import cache
 from services.request_queue import request_queue, Priority
@@ -25,50 +44,196 @@ MODEL_FLASH = "gemini-2.5-flash"
 MODEL_PRO = "gemini-2.5-pro"
 MODEL_FLASH_LITE = "gemini-2.5-flash-lite"
 
+_CNPJ_RE = re.compile(r'\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}')
+
 
 # =============================================================================
 # HELPERS
 # =============================================================================
 
+@lru_cache(maxsize=16)
+def criar_client(api_key: str) -> genai.Client:
+    """
+    Client Gemini do pipeline, um por api_key (reaproveitado entre dossiês:
+    o pool de conexões e as sessões TLS sobrevivem de uma geração para outra).
+    Com h2 instalado, o transporte httpx usa HTTP/2: as chamadas paralelas dos
+    agentes viram streams de uma única conexão TLS.
+    """
+    if not HAS_HTTP2:
+        return genai.Client(api_key=api_key)
+    transporte = {
+        "http2": True,
+        "limits": httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    }
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(client_args=transporte, async_client_args=transporte),
+    )
+
+
+def _json_loads(text: str) -> Any:
+    """json.loads via orjson quando disponível (mesma exceção: JSONDecodeError)."""
+    if HAS_ORJSON:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _json_default(obj: Any) -> Any:
+    """Tipos fora do JSON: as_dict() se houver (Verticalizacao), dataclass vira dict, o resto str."""
+    as_dict = getattr(obj, "as_dict", None)
+    if as_dict is not None:
+        return as_dict()
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    return str(obj)
+
+
+def _fast_dumps(obj: Any, indent: bool = True) -> str:
+    """Serializa payloads de prompt (UTF-8 cru, default=_json_default) com orjson se houver."""
+    if HAS_ORJSON:
+        # orjson serializa dataclasses (inclusive slots) nativamente, em C
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=_json_default, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False, default=_json_default)
+
+
+def _como_json(dados: dict | str) -> str:
+    """Aceita o payload já serializado (reuso entre agentes) ou serializa o dict (compacto)."""
+    return dados if isinstance(dados, str) else _fast_dumps(dados, indent=False)
+
+
+# Média de caracteres por token do Gemini em PT-BR/JSON (estimativa local:
+# count_tokens custaria um round-trip a mais antes de cada chamada)
+_CHARS_POR_TOKEN = 4
+
+
+def _fit_tokens(text: str, max_tokens: int) -> str:
+    """Corta `text` para caber em ~max_tokens, sem partir a última palavra."""
+    limite = max_tokens * _CHARS_POR_TOKEN
+    if len(text) <= limite:
+        return text
+    corte = text.rfind(' ', 0, limite)
+    return text[:corte if corte > 0 else limite]
+
+
+def _cache_key(model: str, prompt: str, config: types.GenerateContentConfig) -> dict:
+    """
+    Chave de cache pelo conteúdo da chamada (modelo, prompt e parâmetros de
+    geração), não pelo nome da empresa: prompts ou configs diferentes nunca
+    colidem, e o mesmo prompt acerta o cache venha de qual agente vier.
+    """
+    thinking = config.thinking_config
+    params = (
+        config.temperature,
+        thinking.thinking_budget if thinking else None,
+        config.max_output_tokens,
+        bool(config.tools),
+        config.response_mime_type,
+    )
+    h = hashlib.sha256(model.encode())
+    h.update(b'\x00')
+    h.update(repr(params).encode())
+    h.update(b'\x00')
+    h.update(prompt.encode())
+    return {"sha256": h.hexdigest()}
+
+
+def _extract_json_span(text: str, open_ch: str = '{', close_ch: str = '}',
+                       start: int = 0) -> Optional[str]:
+    """
+    Primeiro trecho balanceado open_ch...close_ch a partir de `start`, em uma
+    única passada (ignora chaves/colchetes dentro de strings e escapes).
+    """
+    start = text.find(open_ch, start)
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == open_ch:
+            depth += 1
+        elif c == close_ch:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _parse_json_span(text: str, open_ch: str, close_ch: str, max_tentativas: int = 5) -> Any:
+    """
+    Parseia o primeiro trecho balanceado que for JSON válido.
+    Retorna None se nenhum trecho for encontrado/válido.
+    """
+    pos = 0
+    for _ in range(max_tentativas):
+        inicio = text.find(open_ch, pos)
+        if inicio < 0:
+            return None
+        span = _extract_json_span(text, open_ch, close_ch, inicio)
+        if span is None:
+            # Abertura solta que nunca fecha: o JSON, se houver, vem depois dela
+            pos = inicio + 1
+            continue
+        try:
+            return _json_loads(span)
+        except json.JSONDecodeError:
+            # Trecho fechado mas inválido ("{...}" em prosa, vírgula sobrando):
+            # retoma depois dele inteiro — nunca dentro de um objeto aninhado
+            pos = inicio + len(span)
+    return None
+
+
 def _clean_json(text: str) -> Optional[dict]:
     """Extrai e parseia JSON de resposta do Gemini."""
     if not text:
         return None
     
-    # Tenta extrair bloco JSON
-    try:
-        match = re.search(r'\{.*\}', text, re.DOTALL)
-        if match:
-            return json.loads(match.group(0))
-    except (json.JSONDecodeError, AttributeError):
-        pass
-    
-    # Tenta limpar markdown
-    try:
-        clean = text.replace('```json', '').replace('```', '').strip()
-        return json.loads(clean)
-    except (json.JSONDecodeError, ValueError):
-        pass
-    
-    return None
+    # Scanner de chaves: acha o objeto mesmo com prosa/markdown em volta.
+    # Sem nenhum '{' não há objeto possível — nem adianta tentar o parser.
+    if '{' not in text:
+        return None
+    return _parse_json_span(text, '{', '}')
 
 
 def _clean_json_array(text: str) -> Optional[list]:
     """Extrai e parseia JSON array de resposta do Gemini."""
     if not text:
         return None
-    try:
-        match = re.search(r'\[.*\]', text, re.DOTALL)
-        if match:
-            return json.loads(match.group(0))
-    except (json.JSONDecodeError, AttributeError):
-        pass
-    return None
+    return _parse_json_span(text, '[', ']')
+
+
+# Chamadas idênticas em voo (singleflight): chave de conteúdo → Future do texto
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
 
 
 def _safe_call(client, model: str, contents: str, config: types.GenerateContentConfig,
                priority: Priority = Priority.NORMAL) -> Optional[str]:
-    """Wrapper seguro para chamada ao Gemini com rate limiting."""
+    """
+    Wrapper seguro para chamada ao Gemini com rate limiting.
+    Se uma chamada idêntica (modelo + prompt + config) já está em andamento,
+    espera pelo resultado dela em vez de disparar outra.
+    """
+    chave = _cache_key(model, contents, config)["sha256"]
+    with _inflight_lock:
+        fut = _inflight.get(chave)
+        dono = fut is None
+        if dono:
+            fut = _inflight[chave] = Future()
+    if not dono:
+        return fut.result()
+    
     def _do_call():
         resp = client.models.generate_content(
             model=model,
@@ -77,52 +242,84 @@ def _safe_call(client, model: str, contents: str, config: types.GenerateContentC
         )
         return resp.text
     
+    text = None
     try:
-        return request_queue.execute(_do_call, priority=priority)
+        text = request_queue.execute(_do_call, priority=priority, model=model)
     except Exception as e:
-        return None
+        pass
+    finally:
+        # Sempre libera quem está esperando, mesmo se a chamada estourou
+        with _inflight_lock:
+            _inflight.pop(chave, None)
+        fut.set_result(text)
+    return text
 
 
-# =============================================================================
-# AGENTE 1: RECON OPERACIONAL (Flash + Search)
-# =============================================================================
+_BATCH_FINAIS = {
+    "JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED",
+}
 
-def agent_recon_operacional(client, empresa: str) -> dict:
+
+def _safe_call_batch(client, model: str, contents: str, config: types.GenerateContentConfig,
+                     poll_interval: float = 10.0, timeout: float = 1800.0) -> Optional[str]:
     """
-    Agente de Reconhecimento Operacional.
-    Usa Flash + Google Search para mapear a estrutura física.
+    Envia a chamada pela Batch API do Gemini (metade do custo, latência maior)
+    e faz polling até o job terminar. Para passos fora do caminho crítico.
     """
-    cache_key = {"agent": "recon", "empresa": empresa}
-    cached = cache.get("agent_recon", cache_key)
-    if cached:
-        return cached
-    
-    prompt = f"""ATUE COMO: Investigador Agrícola Sênior com 20 anos de experiência.
-ALVO: "{empresa}"
+    try:
+        job = client.batches.create(
+            model=model,
+            src=[types.InlinedRequest(contents=contents, config=config)],
+        )
+        deadline = time.time() + timeout
+        while job.state.name not in _BATCH_FINAIS:
+            if time.time() > deadline:
+                return None
+            time.sleep(poll_interval)
+            job = client.batches.get(name=job.name)
+        
+        if job.state.name != "JOB_STATE_SUCCEEDED" or not job.dest or not job.dest.inlined_responses:
+            return None
+        resposta = job.dest.inlined_responses[0]
+        return resposta.response.text if resposta.response else None
+    except Exception as e:
+        return None
 
-Você deve descobrir a ESTRUTURA FÍSICA E OPERACIONAL do grupo econômico.
-Busque em múltiplas fontes (site oficial, LinkedIn, notícias, Econodata, etc).
 
-INVESTIGUE:
-1. Nome oficial do grupo econômico (pode ser diferente do nome fantasia)
-2. Área TOTAL em hectares — se encontrar números diferentes, pegue o MAIS RECENTE
-3. TODAS as culturas cultivadas (soja, milho, algodão, cana, café, HF, pecuária, etc)
-4. Infraestrutura vertical: tem agroindústria? Silos? Sementeira? Algodoeira? Usina? Frigorífico?
-5. Regiões onde opera (estados, municípios, biomas)
-6. Número aproximado de fazendas/unidades
-7. Tecnologias que usa (agricultura de precisão, drones, ERP, etc)
+def _safe_stream_call(client, model: str, contents: str, config: types.GenerateContentConfig,
+                      on_chunk: Callable[[str], None],
+                      priority: Priority = Priority.NORMAL) -> Optional[str]:
+    """
+    Como _safe_call, mas via streaming: chama `on_chunk(texto_acumulado)`
+    a cada pedaço recebido e retorna o texto completo.
+    """
+    def _do_call():
+        partes = []
+        for chunk in client.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config,
+        ):
+            if chunk.text:
+                partes.append(chunk.text)
+                on_chunk("".join(partes))
+        return "".join(partes)
+    
+    try:
+        return request_queue.execute(_do_call, priority=priority, model=model)
+    except Exception as e:
+        return None
 
-REGRAS:
-- Seja FACTUAL. Não invente dados. Se não encontrar, diga 0.
-- Se encontrar faixa (ex: "20 a 30 mil hectares"), use o valor MÉDIO.
-- Atribua confiança de 0.0 a 1.0 aos dados encontrados.
 
-Retorne APENAS JSON válido:
-{{
+# =============================================================================
+# PROMPTS (instruções + schema, compartilhados pelos agentes e pelo agente unificado)
+# =============================================================================
+
+_SCHEMA_RECON = """{
     "nome_grupo": "Nome Real do Grupo",
     "hectares_total": numero,
     "culturas": ["lista", "de", "culturas"],
-    "verticalizacao": {{
+    "verticalizacao": {
         "agroindustria": bool,
         "sementeira": bool,
         "silos": bool,
@@ -130,47 +327,65 @@ Retorne APENAS JSON válido:
         "usina": bool,
         "frigorifico": bool,
         "fabrica_racao": bool
-    }},
+    },
     "regioes_atuacao": ["MT", "GO"],
     "numero_fazendas": numero,
     "tecnologias_identificadas": ["lista"],
     "confianca": 0.8
-}}"""
+}"""
 
-    config = types.GenerateContentConfig(
-        tools=[types.Tool(google_search=types.GoogleSearch())],
-        temperature=0.1,
-        # Para modelos com thinking, budget de tokens para raciocínio
-        thinking_config=types.ThinkingConfig(thinking_budget=2048),
-    )
-    
-    text = _safe_call(client, MODEL_FLASH, prompt, config, Priority.HIGH)
-    result = _clean_json(text) or {
-        "nome_grupo": empresa,
-        "hectares_total": 0,
-        "confianca": 0.0,
-    }
-    
-    cache.set("agent_recon", cache_key, result, ttl=7200)
-    return result
+_SCHEMA_FINANCEIRO = """{
+    "capital_social_estimado": numero,
+    "funcionarios_estimados": numero,
+    "faturamento_estimado": numero,
+    "movimentos_financeiros": ["Fato 1: Emissão de CRA de R$50M via Itaú BBA em 2023", "Fato 2: ..."],
+    "fiagros_relacionados": ["SNFZ11 (Suno)", "..."],
+    "cras_emitidos": ["CRA Série X - R$YM - Estruturador Z"],
+    "parceiros_financeiros": ["Itaú BBA", "XP", "..."],
+    "auditorias": ["Deloitte", "..."],
+    "governanca_corporativa": bool,
+    "resumo_financeiro": "Texto curto sobre a robustez financeira do grupo.",
+    "confianca": 0.7
+}"""
+
+_SCHEMA_INTEL = """{
+    "noticias_recentes": [
+        {"titulo": "...", "resumo": "...", "data_aprox": "2024-XX", "relevancia": "alta/media/baixa"},
+    ],
+    "sinais_compra": ["Sinal 1: ...", "Sinal 2: ..."],
+    "riscos": ["Risco 1: ...", "Risco 2: ..."],
+    "oportunidades": ["Oportunidade 1: ...", "Oportunidade 2: ..."],
+    "concorrentes": ["Empresa X", "Empresa Y"],
+    "dores_identificadas": ["Dor 1: ...", "Dor 2: ..."],
+    "confianca": 0.7
+}"""
 
 
-# =============================================================================
-# AGENTE 2: SNIPER FINANCEIRO (Flash + Search)
-# =============================================================================
+def _instrucoes_recon(empresa: str) -> str:
+    return f"""ATUE COMO: Investigador Agrícola Sênior com 20 anos de experiência.
+ALVO: "{empresa}"
 
-def agent_sniper_financeiro(client, empresa: str, nome_grupo: str = "") -> dict:
-    """
-    Agente Sniper Financeiro.
-    Deep dive em movimentações financeiras, Fiagro, CRA, governança.
-    """
-    alvo = nome_grupo or empresa
-    cache_key = {"agent": "financeiro", "empresa": alvo}
-    cached = cache.get("agent_fin", cache_key)
-    if cached:
-        return cached
-    
-    prompt = f"""ATUE COMO: Analista Sênior de Mercado de Capitais especializado em Agro.
+Você deve descobrir a ESTRUTURA FÍSICA E OPERACIONAL do grupo econômico.
+Busque em múltiplas fontes (site oficial, LinkedIn, notícias, Econodata, etc).
+
+INVESTIGUE:
+1. Nome oficial do grupo econômico (pode ser diferente do nome fantasia)
+2. Área TOTAL em hectares — se encontrar números diferentes, pegue o MAIS RECENTE
+3. TODAS as culturas cultivadas (soja, milho, algodão, cana, café, HF, pecuária, etc)
+4. Infraestrutura vertical: tem agroindústria? Silos? Sementeira? Algodoeira? Usina? Frigorífico?
+5. Regiões onde opera (estados, municípios, biomas)
+6. Número aproximado de fazendas/unidades
+7. Tecnologias que usa (agricultura de precisão, drones, ERP, etc)
+
+REGRAS:
+- Seja FACTUAL. Não invente dados. Se não encontrar, diga 0.
+- Se encontrar faixa (ex: "20 a 30 mil hectares"), use o valor MÉDIO.
+- Atribua confiança de 0.0 a 1.0 aos dados encontrados.
+"""
+
+
+def _instrucoes_financeiro(empresa: str, alvo: str) -> str:
+    return f"""ATUE COMO: Analista Sênior de Mercado de Capitais especializado em Agro.
 ALVO: "{alvo}" (também pesquise como "{empresa}" se for diferente)
 
 Você é um detective financeiro. Vasculhe a web procurando ESPECIFICAMENTE:
@@ -200,29 +415,134 @@ Você é um detective financeiro. Vasculhe a web procurando ESPECIFICAMENTE:
    
 6. PARCEIROS FINANCEIROS:
    - Bancos, gestoras, seguradoras com relacionamento
+"""
+
+
+def _instrucoes_intel(empresa: str, setor_info: str = "") -> str:
+    return f"""ATUE COMO: Analista de Inteligência Competitiva focado em Agronegócio.
+ALVO: "{empresa}"
+{f'CONTEXTO DO SETOR: {setor_info}' if setor_info else ''}
+
+Busque as NOTÍCIAS E SINAIS mais recentes (últimos 12 meses) sobre esta empresa.
+
+INVESTIGUE:
+1. NOTÍCIAS RECENTES: Expansão? Crise? Investimento? Novo projeto?
+2. SINAIS DE COMPRA para ERP/tecnologia:
+   - Expansão de área ou de operações
+   - Contratação de C-level (CFO, CTO, CIO)
+   - Problemas operacionais reportados
+   - Auditoria ou IPO (precisam de sistemas)
+3. RISCOS: Processos judiciais, problemas ambientais, inadimplência
+4. CONCORRENTES: Quem mais atua no mesmo segmento/região?
+5. OPORTUNIDADES: Janelas de venda, dores explícitas
+"""
+
 
+def _prompt_recon(empresa: str) -> str:
+    return f"""{_instrucoes_recon(empresa)}
 Retorne APENAS JSON válido:
-{{
-    "capital_social_estimado": numero,
-    "funcionarios_estimados": numero,
-    "faturamento_estimado": numero,
-    "movimentos_financeiros": ["Fato 1: Emissão de CRA de R$50M via Itaú BBA em 2023", "Fato 2: ..."],
-    "fiagros_relacionados": ["SNFZ11 (Suno)", "..."],
-    "cras_emitidos": ["CRA Série X - R$YM - Estruturador Z"],
-    "parceiros_financeiros": ["Itaú BBA", "XP", "..."],
-    "auditorias": ["Deloitte", "..."],
-    "governanca_corporativa": bool,
-    "resumo_financeiro": "Texto curto sobre a robustez financeira do grupo.",
-    "confianca": 0.7
-}}"""
+{_SCHEMA_RECON}"""
 
-    config = types.GenerateContentConfig(
+
+def _prompt_financeiro(empresa: str, alvo: str) -> str:
+    return f"""{_instrucoes_financeiro(empresa, alvo)}
+Retorne APENAS JSON válido:
+{_SCHEMA_FINANCEIRO}"""
+
+
+def _prompt_intel(empresa: str, setor_info: str = "") -> str:
+    return f"""{_instrucoes_intel(empresa, setor_info)}
+Retorne APENAS JSON válido:
+{_SCHEMA_INTEL}"""
+
+
+def _config_busca(temperature: float, thinking_budget: int,
+                  max_output_tokens: Optional[int] = None) -> types.GenerateContentConfig:
+    """Config Flash + Google Search dos agentes de coleta."""
+    return types.GenerateContentConfig(
         tools=[types.Tool(google_search=types.GoogleSearch())],
-        temperature=0.1,
-        thinking_config=types.ThinkingConfig(thinking_budget=2048),
+        temperature=temperature,
+        # Para modelos com thinking, budget de tokens para raciocínio
+        thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+        max_output_tokens=max_output_tokens,
     )
+
+
+_CONFIG_RECON = _config_busca(0.1, 2048)
+_CONFIG_FINANCEIRO = _config_busca(0.1, 2048)
+_CONFIG_INTEL = _config_busca(0.2, 1024)
+_CONFIG_FULL = _config_busca(0.1, 4096, max_output_tokens=12288)
+
+
+# =============================================================================
+# SCHEMAS DE SAÍDA (structured output)
+# =============================================================================
+# O Gemini não aceita response_schema junto com a ferramenta Google Search,
+# então só os agentes sem busca (auditor) usam JSON garantido pelo modelo.
+
+class _NotaCriterio(BaseModel):
+    nota: int
+    justificativa: str
+
+
+class _ScoresAuditoria(BaseModel):
+    precisao: _NotaCriterio
+    profundidade: _NotaCriterio
+    acionabilidade: _NotaCriterio
+    personalizacao: _NotaCriterio
+    completude: _NotaCriterio
+    dados_financeiros: _NotaCriterio
+
+
+class AuditOut(BaseModel):
+    scores: _ScoresAuditoria
+    nota_final: float
+    nivel: Literal["EXCELENTE", "BOM", "ACEITAVEL", "INSUFICIENTE"]
+    recomendacoes: list[str]
+
+
+# =============================================================================
+# AGENTE 1: RECON OPERACIONAL (Flash + Search)
+# =============================================================================
+
+def agent_recon_operacional(client, empresa: str) -> dict:
+    """
+    Agente de Reconhecimento Operacional.
+    Usa Flash + Google Search para mapear a estrutura física.
+    """
+    prompt = _prompt_recon(empresa)
+    cache_key = _cache_key(MODEL_FLASH, prompt, _CONFIG_RECON)
+    cached = cache.get("agent_recon", cache_key)
+    if cached:
+        return cached
     
-    text = _safe_call(client, MODEL_FLASH, prompt, config, Priority.HIGH)
+    text = _safe_call(client, MODEL_FLASH, prompt, _CONFIG_RECON, Priority.HIGH)
+    result = _clean_json(text) or {
+        "nome_grupo": empresa,
+        "hectares_total": 0,
+        "confianca": 0.0,
+    }
+    
+    cache.set("agent_recon", cache_key, result, ttl=7200)
+    return result
+
+
+# =============================================================================
+# AGENTE 2: SNIPER FINANCEIRO (Flash + Search)
+# =============================================================================
+
+def agent_sniper_financeiro(client, empresa: str, nome_grupo: str = "") -> dict:
+    """
+    Agente Sniper Financeiro.
+    Deep dive em movimentações financeiras, Fiagro, CRA, governança.
+    """
+    prompt = _prompt_financeiro(empresa, nome_grupo or empresa)
+    cache_key = _cache_key(MODEL_FLASH, prompt, _CONFIG_FINANCEIRO)
+    cached = cache.get("agent_fin", cache_key)
+    if cached:
+        return cached
+    
+    text = _safe_call(client, MODEL_FLASH, prompt, _CONFIG_FINANCEIRO, Priority.HIGH)
     result = _clean_json(text) or {"confianca": 0.0}
     
     cache.set("agent_fin", cache_key, result, ttl=7200)
@@ -238,51 +558,83 @@ def agent_intel_mercado(client, empresa: str, setor_info: str = "") -> dict:
     Agente de Inteligência de Mercado.
     Busca notícias recentes, sinais de compra, riscos e oportunidades.
     """
-    cache_key = {"agent": "intel", "empresa": empresa}
+    prompt = _prompt_intel(empresa, setor_info)
+    cache_key = _cache_key(MODEL_FLASH, prompt, _CONFIG_INTEL)
     cached = cache.get("agent_intel", cache_key)
     if cached:
         return cached
     
-    prompt = f"""ATUE COMO: Analista de Inteligência Competitiva focado em Agronegócio.
-ALVO: "{empresa}"
-{f'CONTEXTO DO SETOR: {setor_info}' if setor_info else ''}
+    text = _safe_call(client, MODEL_FLASH, prompt, _CONFIG_INTEL, Priority.NORMAL)
+    result = _clean_json(text) or {"confianca": 0.0}
+    
+    cache.set("agent_intel", cache_key, result, ttl=3600)
+    return result
 
-Busque as NOTÍCIAS E SINAIS mais recentes (últimos 12 meses) sobre esta empresa.
 
-INVESTIGUE:
-1. NOTÍCIAS RECENTES: Expansão? Crise? Investimento? Novo projeto?
-2. SINAIS DE COMPRA para ERP/tecnologia:
-   - Expansão de área ou de operações
-   - Contratação de C-level (CFO, CTO, CIO)
-   - Problemas operacionais reportados
-   - Auditoria ou IPO (precisam de sistemas)
-3. RISCOS: Processos judiciais, problemas ambientais, inadimplência
-4. CONCORRENTES: Quem mais atua no mesmo segmento/região?
-5. OPORTUNIDADES: Janelas de venda, dores explícitas
+# =============================================================================
+# AGENTE UNIFICADO: RECON + FINANCEIRO + INTEL (uma chamada Flash + Search)
+# =============================================================================
 
-Retorne APENAS JSON válido:
+def agent_recon_full(client, empresa: str, setor_info: str = "") -> dict:
+    """
+    Agentes 1, 2 e 3 em uma única chamada.
+    Troca três round-trips (e três setups do Google Search) por um só, com
+    resposta maior. Retorna {"operacional": {...}, "financeiro": {...}, "intel": {...}}
+    e já semeia o cache de cada agente individual.
+    """
+    prompt = f"""Você vai executar TRÊS investigações sobre o mesmo alvo e devolver tudo em UM JSON.
+
+=== SECTION: OPERACIONAL ===
+{_instrucoes_recon(empresa)}
+=== SECTION: FINANCEIRO ===
+{_instrucoes_financeiro(empresa, empresa)}
+=== SECTION: INTEL ===
+{_instrucoes_intel(empresa, setor_info)}
+Retorne APENAS JSON válido, com exatamente estas três chaves:
 {{
-    "noticias_recentes": [
-        {{"titulo": "...", "resumo": "...", "data_aprox": "2024-XX", "relevancia": "alta/media/baixa"}},
-    ],
-    "sinais_compra": ["Sinal 1: ...", "Sinal 2: ..."],
-    "riscos": ["Risco 1: ...", "Risco 2: ..."],
-    "oportunidades": ["Oportunidade 1: ...", "Oportunidade 2: ..."],
-    "concorrentes": ["Empresa X", "Empresa Y"],
-    "dores_identificadas": ["Dor 1: ...", "Dor 2: ..."],
-    "confianca": 0.7
+    "operacional": {_SCHEMA_RECON},
+    "financeiro": {_SCHEMA_FINANCEIRO},
+    "intel": {_SCHEMA_INTEL}
 }}"""
-
-    config = types.GenerateContentConfig(
-        tools=[types.Tool(google_search=types.GoogleSearch())],
-        temperature=0.2,
-        thinking_config=types.ThinkingConfig(thinking_budget=1024),
-    )
+    cache_key = _cache_key(MODEL_FLASH, prompt, _CONFIG_FULL)
+    cached = cache.get("agent_full", cache_key)
+    if cached:
+        return cached
     
-    text = _safe_call(client, MODEL_FLASH, prompt, config, Priority.NORMAL)
-    result = _clean_json(text) or {"confianca": 0.0}
+    text = _safe_call(client, MODEL_FLASH, prompt, _CONFIG_FULL, Priority.HIGH)
+    parsed = _clean_json(text) or {}
+    # Só conta como resposta a seção que veio como objeto não vazio
+    secoes = {
+        k: v if isinstance(v := parsed.get(k), dict) and v else None
+        for k in ("operacional", "financeiro", "intel")
+    }
+    result = {
+        "operacional": secoes["operacional"] or {
+            "nome_grupo": empresa,
+            "hectares_total": 0,
+            "confianca": 0.0,
+        },
+        "financeiro": secoes["financeiro"] or {"confianca": 0.0},
+        "intel": secoes["intel"] or {"confianca": 0.0},
+    }
     
-    cache.set("agent_intel", cache_key, result, ttl=3600)
+    # Semeia com as mesmas chaves que os agentes individuais calculariam, mas
+    # só o que o modelo devolveu: fallback nunca vai para o cache
+    if all(secoes.values()):
+        cache.set("agent_full", cache_key, result, ttl=3600)
+    if secoes["operacional"]:
+        cache.set("agent_recon", _cache_key(MODEL_FLASH, _prompt_recon(empresa), _CONFIG_RECON),
+                  result["operacional"], ttl=7200)
+    if secoes["financeiro"]:
+        # O pipeline separado chama o Sniper com o nome_grupo do Recon (ou a
+        # empresa, se vier vazio): a semente usa o mesmo alvo para casar
+        nome_grupo = result["operacional"].get("nome_grupo")
+        alvo = nome_grupo if isinstance(nome_grupo, str) and nome_grupo else empresa
+        cache.set("agent_fin", _cache_key(MODEL_FLASH, _prompt_financeiro(empresa, alvo), _CONFIG_FINANCEIRO),
+                  result["financeiro"], ttl=7200)
+    if secoes["intel"]:
+        cache.set("agent_intel", _cache_key(MODEL_FLASH, _prompt_intel(empresa, setor_info), _CONFIG_INTEL),
+                  result["intel"], ttl=3600)
     return result
 
 
@@ -290,21 +642,24 @@ Retorne APENAS JSON válido:
 # AGENTE 4: ANÁLISE ESTRATÉGICA (Pro — Raciocínio Profundo)
 # =============================================================================
 
-def agent_analise_estrategica(client, dados_completos: dict, sas_result: dict,
-                               contexto_mercado: str = "") -> str:
+def agent_analise_estrategica(client, dados_completos: dict | str, sas_result: dict,
+                               contexto_mercado: str = "",
+                               on_chunk: Optional[Callable[[str], None]] = None) -> str:
     """
     Agente Analista Estratégico.
     Usa Gemini Pro para análise profunda e redação do dossiê.
+    Se `on_chunk` for passado, a resposta é transmitida em streaming.
+    `dados_completos` pode vir já serializado (_fast_dumps) para ser reaproveitado.
     """
     prompt = f"""VOCÊ É: Sara, Analista Sênior de Inteligência de Vendas para o Agronegócio.
 Você trabalha na Senior Sistemas e prepara briefings estratégicos ("off-the-record") 
 para Executivos de Contas que vão prospectar grandes operações agrícolas.
 
 DADOS COLETADOS SOBRE O ALVO:
-{json.dumps(dados_completos, indent=2, ensure_ascii=False, default=str)}
+{_como_json(dados_completos)}
 
 SCORE SAS 4.0: {sas_result.get('score', 0)}/1000 — Classificação: {sas_result.get('tier', 'N/D')}
-BREAKDOWN: {json.dumps(sas_result.get('breakdown', {}), ensure_ascii=False)}
+BREAKDOWN: {_fast_dumps(sas_result.get('breakdown', {}), indent=False)}
 
 {contexto_mercado}
 
@@ -352,7 +707,10 @@ SEÇÃO 4 — PLANO DE ATAQUE:
         max_output_tokens=16000,
     )
     
-    text = _safe_call(client, MODEL_PRO, prompt, config, Priority.CRITICAL)
+    if on_chunk is not None:
+        text = _safe_stream_call(client, MODEL_PRO, prompt, config, on_chunk, Priority.CRITICAL)
+    else:
+        text = _safe_call(client, MODEL_PRO, prompt, config, Priority.CRITICAL)
     return text or "Erro ao gerar análise estratégica."
 
 
@@ -360,19 +718,22 @@ SEÇÃO 4 — PLANO DE ATAQUE:
 # AGENTE 5: AUDITOR DE QUALIDADE (Pro)
 # =============================================================================
 
-def agent_auditor_qualidade(client, texto_dossie: str, dados: dict) -> dict:
+def agent_auditor_qualidade(client, texto_dossie: str, dados: dict | str,
+                            batch: bool = False) -> dict:
     """
     Agente Auditor de Qualidade.
     Revisa o dossiê e pontua qualidade. Equivalente ao qualityGateService.ts.
+    `dados` aceita o mesmo JSON já serializado passado à análise estratégica.
+    Com `batch=True` vai pela Batch API (mais barato, sem pressa de UI).
     """
     prompt = f"""ATUE COMO: Editor-Chefe de um relatório de inteligência de vendas.
 Você está revisando o dossiê abaixo antes de ser entregue ao Executivo de Contas.
 
 === DOSSIÊ A SER AUDITADO ===
-{texto_dossie[:8000]}
+{_fit_tokens(texto_dossie, 2000)}
 
 === DADOS BASE ===
-{json.dumps(dados, indent=2, ensure_ascii=False, default=str)[:4000]}
+{_fit_tokens(_como_json(dados), 1000)}
 
 === AUDITORIA ===
 Avalie o dossiê em cada critério (0 a 10) e justifique brevemente:
@@ -402,10 +763,23 @@ Retorne APENAS JSON:
     config = types.GenerateContentConfig(
         temperature=0.2,
         thinking_config=types.ThinkingConfig(thinking_budget=4096),
+        response_mime_type="application/json",
+        response_schema=AuditOut,
     )
     
-    text = _safe_call(client, MODEL_PRO, prompt, config, Priority.NORMAL)
-    result = _clean_json(text) or {
+    if batch:
+        text = _safe_call_batch(client, MODEL_PRO, prompt, config)
+    else:
+        text = _safe_call(client, MODEL_PRO, prompt, config, Priority.NORMAL)
+    
+    # Com response_schema a resposta já é o JSON puro; o scanner fica de rede
+    result = None
+    if text:
+        try:
+            result = _json_loads(text)
+        except json.JSONDecodeError:
+            result = _clean_json(text)
+    result = result or {
         "nota_final": 0,
         "nivel": "INSUFICIENTE",
         "recomendacoes": ["Erro na auditoria automática"],
@@ -438,7 +812,7 @@ Retorne APENAS o CNPJ no formato XX.XXX.XXX/XXXX-XX ou "NAO_ENCONTRADO"."""
     text = _safe_call(client, MODEL_FLASH, prompt, config, Priority.HIGH)
     if text and "NAO_ENCONTRADO" not in text:
         # Tenta extrair CNPJ do texto
-        match = re.search(r'\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}', text)
+        match = _CNPJ_RE.search(text)
         if match:
             cnpj = match.group(0)
             cache.set("busca_cnpj", cache_key, cnpj, ttl=86400)
@@ -4,9 +4,18 @@ Equivalente ao marketEstimator.ts.
 Calculadora determinística (sem IA) do Senior Agro Score.
 Inclui lookup tables robustas, heurísticas de preenchimento e justificativas.
 """
+import bisect
 import math
+import re
+from functools import lru_cache
 from typing import Optional
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 from scout_types import (
     SASResult, SASBreakdown, Tier, Verticalizacao,
 )
@@ -16,61 +25,104 @@ from scout_types import (
 # LOOKUP TABLES
 # =============================================================================
 
+# Limiares de score (inclusivos) → tier
+_TIER_LIMITES = (251, 501, 751)
+_TIERS = (Tier.BRONZE, Tier.PRATA, Tier.OURO, Tier.DIAMANTE)
+
+
+# Capital social: limiares (≥) em ordem crescente; índice do bisect → faixa
+_CAPITAL_LIMIARES = (500_000, 1_000_000, 5_000_000, 10_000_000, 20_000_000,
+                     50_000_000, 100_000_000, 200_000_000)
+_CAPITAL_FAIXAS = (
+    (10,  "Capital < R$500k → Microempresa"),
+    (30,  "Capital ≥ R$500k → Pequena Empresa"),
+    (50,  "Capital ≥ R$1M → PME"),
+    (70,  "Capital ≥ R$5M → PME Robusta"),
+    (100, "Capital ≥ R$10M → Média Empresa"),
+    (120, "Capital ≥ R$20M → Empresa de Médio-Grande Porte"),
+    (150, "Capital ≥ R$50M → Empresa Consolidada"),
+    (180, "Capital ≥ R$100M → Grande Empresa"),
+    (200, "Capital ≥ R$200M → Corporação de Grande Porte"),
+)
+
+# Hectares (> 0): limiares (≥) e (pontos, porte)
+_HECTARES_LIMIARES = (500, 1_000, 3_000, 5_000, 10_000, 20_000, 50_000, 100_000)
+_HECTARES_FAIXAS = (
+    (10,  "Micro Produtor"),
+    (30,  "Pequeno Produtor"),
+    (50,  "Pequeno-Médio"),
+    (80,  "Médio Produtor"),
+    (100, "Médio-Grande"),
+    (130, "Produtor Consolidado"),
+    (150, "Grande Produtor"),
+    (180, "Operação Gigante"),
+    (200, "Mega-operação"),
+)
+
+# Funcionários (> 0): limiares (≥) e (pontos, porte)
+_FUNCIONARIOS_LIMIARES = (20, 50, 100, 200, 500, 1000)
+_FUNCIONARIOS_FAIXAS = (
+    (15,  "Micro"),
+    (30,  "Pequeno"),
+    (60,  "Pequeno-Médio"),
+    (90,  "Médio"),
+    (120, "Médio-Grande"),
+    (150, "Grande empregador"),
+    (200, "Operação massiva"),
+)
+
+
 def _lookup_capital(valor: float) -> tuple[int, str]:
     """Capital social → pontos (max 200)."""
-    if valor >= 200_000_000: return 200, "Capital ≥ R$200M → Corporação de Grande Porte"
-    if valor >= 100_000_000: return 180, "Capital ≥ R$100M → Grande Empresa"
-    if valor >= 50_000_000:  return 150, "Capital ≥ R$50M → Empresa Consolidada"
-    if valor >= 20_000_000:  return 120, "Capital ≥ R$20M → Empresa de Médio-Grande Porte"
-    if valor >= 10_000_000:  return 100, "Capital ≥ R$10M → Média Empresa"
-    if valor >= 5_000_000:   return 70,  "Capital ≥ R$5M → PME Robusta"
-    if valor >= 1_000_000:   return 50,  "Capital ≥ R$1M → PME"
-    if valor >= 500_000:     return 30,  "Capital ≥ R$500k → Pequena Empresa"
-    return 10, "Capital < R$500k → Microempresa"
+    return _CAPITAL_FAIXAS[bisect.bisect_right(_CAPITAL_LIMIARES, valor)]
 
 
 def _lookup_hectares(valor: int) -> tuple[int, str]:
     """Hectares → pontos (max 200)."""
-    if valor >= 100_000: return 200, f"{valor:,} ha → Mega-operação"
-    if valor >= 50_000:  return 180, f"{valor:,} ha → Operação Gigante"
-    if valor >= 20_000:  return 150, f"{valor:,} ha → Grande Produtor"
-    if valor >= 10_000:  return 130, f"{valor:,} ha → Produtor Consolidado"
-    if valor >= 5_000:   return 100, f"{valor:,} ha → Médio-Grande"
-    if valor >= 3_000:   return 80,  f"{valor:,} ha → Médio Produtor"
-    if valor >= 1_000:   return 50,  f"{valor:,} ha → Pequeno-Médio"
-    if valor >= 500:     return 30,  f"{valor:,} ha → Pequeno Produtor"
-    if valor > 0:        return 10,  f"{valor:,} ha → Micro Produtor"
-    return 0, "Sem dados de área"
-
-
-def _lookup_cultura(culturas: list[str]) -> tuple[int, str]:
-    """Culturas → pontos de complexidade (max 150)."""
+    if valor <= 0:
+        return 0, "Sem dados de área"
+    pts, porte = _HECTARES_FAIXAS[bisect.bisect_right(_HECTARES_LIMIARES, valor)]
+    return pts, f"{valor:,} ha → {porte}"
+
+
+# Scoring por complexidade operacional (em empate vale a primeira da tabela)
+_CULTURA_SCORES = {
+    "cana": 150, "usina": 150,
+    "semente": 140, "sementes": 140,
+    "algod": 130, "algodoeira": 130,
+    "café": 120, "cafe": 120,
+    "alho": 120, "batata": 110, "hf": 110, "hortifruti": 110,
+    "pecuária": 100, "pecuaria": 100, "gado": 100, "boi": 100,
+    "laranja": 100, "citrus": 100,
+    "soja": 80, "milho": 80,
+    "trigo": 70,
+    "feijão": 60, "feijao": 60,
+    "arroz": 60,
+}
+# Uma passada de regex no texto; alternativas de maior score primeiro para
+# que, na mesma posição, a palavra mais valiosa seja a capturada
+_CULTURA_RE = re.compile('|'.join(
+    map(re.escape, sorted(_CULTURA_SCORES, key=lambda k: -_CULTURA_SCORES[k]))
+))
+_CULTURA_ORDEM = {k: i for i, k in enumerate(_CULTURA_SCORES)}
+
+
+@lru_cache(maxsize=256)
+def _lookup_cultura(culturas: tuple[str, ...]) -> tuple[int, str]:
+    """Culturas → pontos de complexidade (max 150). Memorizado: recebe tupla."""
     if not culturas:
         return 50, "Culturas não identificadas → score padrão"
     
     txt = " ".join(culturas).lower()
     
-    # Scoring por complexidade operacional
-    scores = {
-        "cana": 150, "usina": 150,
-        "semente": 140, "sementes": 140,
-        "algod": 130, "algodoeira": 130,
-        "café": 120, "cafe": 120,
-        "alho": 120, "batata": 110, "hf": 110, "hortifruti": 110,
-        "pecuária": 100, "pecuaria": 100, "gado": 100, "boi": 100,
-        "laranja": 100, "citrus": 100,
-        "soja": 80, "milho": 80,
-        "trigo": 70,
-        "feijão": 60, "feijao": 60,
-        "arroz": 60,
-    }
-    
     best_score = 50
     best_label = "Culturas genéricas"
     
-    for keyword, score in scores.items():
-        if keyword in txt and score > best_score:
-            best_score = score
+    hits = set(_CULTURA_RE.findall(txt))
+    if hits:
+        keyword = min(hits, key=lambda k: (-_CULTURA_SCORES[k], _CULTURA_ORDEM[k]))
+        if _CULTURA_SCORES[keyword] > best_score:
+            best_score = _CULTURA_SCORES[keyword]
             best_label = f"Cultura detectada: {keyword}"
     
     # Bônus por diversificação (múltiplas culturas = mais complexidade)
@@ -85,51 +137,61 @@ def _lookup_cultura(culturas: list[str]) -> tuple[int, str]:
     return best_score, best_label
 
 
+# Verticalização: (flag, pontos, rótulo) na ordem dos rótulos. As 128
+# combinações possíveis são pré-computadas e indexadas direto por
+# Verticalizacao.bits.
+_VERT_BITS = tuple(
+    (1 << Verticalizacao.BIT_NAMES.index(flag), pts, rotulo)
+    for flag, pts, rotulo in (
+        ("agroindustria", 40, "Agroindústria"),
+        ("usina", 40, "Usina"),
+        ("sementeira", 30, "Sementeira"),
+        ("silos", 25, "Silos"),
+        ("algodoeira", 25, "Algodoeira"),
+        ("frigorifico", 35, "Frigorífico"),
+        ("fabrica_racao", 20, "Fábrica de Ração"),
+    )
+)
+_VERT_LUT = tuple(
+    (
+        min(sum(pts for bit, pts, _ in _VERT_BITS if m & bit), 100),
+        ", ".join(rot for bit, _, rot in _VERT_BITS if m & bit) or "Não verticalizado",
+    )
+    for m in range(1 << len(_VERT_BITS))
+)
+
+
 def _lookup_verticalizacao(vert: Optional[Verticalizacao]) -> tuple[int, str]:
     """Verticalização → pontos (max 100)."""
     if vert is None:
         return 0, "Sem dados de verticalização"
-    
-    pts = 0
-    labels = []
-    
-    if vert.agroindustria:
-        pts += 40
-        labels.append("Agroindústria")
-    if vert.usina:
-        pts += 40
-        labels.append("Usina")
-    if vert.sementeira:
-        pts += 30
-        labels.append("Sementeira")
-    if vert.silos:
-        pts += 25
-        labels.append("Silos")
-    if vert.algodoeira:
-        pts += 25
-        labels.append("Algodoeira")
-    if vert.frigorifico:
-        pts += 35
-        labels.append("Frigorífico")
-    if vert.fabrica_racao:
-        pts += 20
-        labels.append("Fábrica de Ração")
-    
-    pts = min(pts, 100)
-    label = ", ".join(labels) if labels else "Não verticalizado"
-    return pts, label
+    return _VERT_LUT[vert.bits]
 
 
 def _lookup_funcionarios(valor: int) -> tuple[int, str]:
     """Funcionários → pontos (max 200)."""
-    if valor >= 1000: return 200, f"{valor} funcs → Operação massiva"
-    if valor >= 500:  return 150, f"{valor} funcs → Grande empregador"
-    if valor >= 200:  return 120, f"{valor} funcs → Médio-Grande"
-    if valor >= 100:  return 90,  f"{valor} funcs → Médio"
-    if valor >= 50:   return 60,  f"{valor} funcs → Pequeno-Médio"
-    if valor >= 20:   return 30,  f"{valor} funcs → Pequeno"
-    if valor > 0:     return 15,  f"{valor} funcs → Micro"
-    return 0, "Sem dados de funcionários"
+    if valor <= 0:
+        return 0, "Sem dados de funcionários"
+    pts, porte = _FUNCIONARIOS_FAIXAS[bisect.bisect_right(_FUNCIONARIOS_LIMIARES, valor)]
+    return pts, f"{valor} funcs → {porte}"
+
+
+# Sinais de governança/tecnologia: uma regex por grupo, ancorada no início da
+# palavra (sem isso 'xp' casava com "expansão" e 'iot' com "patriota")
+_PARCEIROS_RE = re.compile(r'\b(?:xp|suno|valora|itaú|btg)')
+_ERP_RE = re.compile(r'\b(?:erp|senior|sap|totvs)')
+_AGTECH_RE = re.compile(r'\b(?:agricultura de precisão|drone|telemetria|iot)')
+
+
+def _como_texto(valor) -> str:
+    """Campo do merge (str, lista de str ou vazio) como texto corrido, sem repr de lista."""
+    if not valor:
+        return ""
+    if isinstance(valor, str):
+        return valor
+    if isinstance(valor, (list, tuple)):
+        return " ".join(map(str, valor))
+    return str(valor)
 
 
 def _lookup_governanca(dados: dict) -> tuple[int, str]:
@@ -137,11 +199,12 @@ def _lookup_governanca(dados: dict) -> tuple[int, str]:
     pts = 0
     labels = []
     
-    # Fiagro/CRA = sinais fortes de governança
-    movimentos = str(dados.get('movimentos_financeiros', '')).lower()
-    fiagros = str(dados.get('fiagros', '')).lower()
-    cras = str(dados.get('cras', '')).lower()
-    all_fin = f"{movimentos} {fiagros} {cras}"
+    # Fiagro/CRA = sinais fortes de governança (um único texto, um único lower)
+    all_fin = " ".join((
+        _como_texto(dados.get('movimentos_financeiros')),
+        _como_texto(dados.get('fiagros')),
+        _como_texto(dados.get('cras')),
+    )).lower()
     
     if 'fiagro' in all_fin:
         pts += 40
@@ -152,21 +215,21 @@ def _lookup_governanca(dados: dict) -> tuple[int, str]:
     if 'auditoria' in all_fin or dados.get('governanca', False):
         pts += 30
         labels.append("Governança corporativa")
-    if any(x in all_fin for x in ['xp', 'suno', 'valora', 'itaú', 'btg']):
+    if _PARCEIROS_RE.search(all_fin):
         pts += 25
         labels.append("Parceiro financeiro relevante")
     
     # Tecnologias
-    techs = str(dados.get('tecnologias', '')).lower()
-    if any(x in techs for x in ['erp', 'senior', 'sap', 'totvs']):
+    techs = _como_texto(dados.get('tecnologias')).lower()
+    if _ERP_RE.search(techs):
         pts += 20
         labels.append("ERP/sistema de gestão")
-    if any(x in techs for x in ['agricultura de precisão', 'drone', 'telemetria', 'iot']):
+    if _AGTECH_RE.search(techs):
         pts += 15
         labels.append("Ag-tech")
     
     # Natureza jurídica (S.A. = mais governança)
-    nat_jur = str(dados.get('natureza_juridica', '')).lower()
+    nat_jur = _como_texto(dados.get('natureza_juridica')).lower()
     if 's.a.' in nat_jur or 'sociedade anônima' in nat_jur:
         pts += 25
         labels.append("S.A. (Governança implícita)")
@@ -186,6 +249,14 @@ def _lookup_governanca(dados: dict) -> tuple[int, str]:
 # HEURÍSTICAS DE PREENCHIMENTO
 # =============================================================================
 
+# Classificadores das heurísticas: uma regex compilada por grupo (mesma
+# semântica de substring das listas originais, uma passada em C por texto)
+_INTENSIVAS_RE = re.compile('cana|batata|alho|semente|hf')
+_SEMI_INTENSIVAS_RE = re.compile('café|algod|laranja')
+_CERRADO_RE = re.compile('mt|mato grosso|matopiba|ba|to|pi|ma')
+_SUL_SUDESTE_RE = re.compile('sp|são paulo|pr|paraná|rs')
+
+
 def _heuristic_fill(dados: dict) -> tuple[dict, list[str]]:
     """
     Se a busca na web não trouxe números exatos, estima via heurísticas.
@@ -193,15 +264,17 @@ def _heuristic_fill(dados: dict) -> tuple[dict, list[str]]:
     """
     inferencias = []
     hectares = dados.get('hectares_total', 0)
+    if not hectares > 0:
+        return dados, inferencias  # toda heurística parte da área
     
     # Funcionários estimados
-    if dados.get('funcionarios_estimados', 0) == 0 and hectares > 0:
+    if dados.get('funcionarios_estimados', 0) == 0:
         culturas_txt = " ".join(dados.get('culturas', [])).lower()
         
         # Fator: hectares por funcionário
-        if any(x in culturas_txt for x in ['cana', 'batata', 'alho', 'semente', 'hf']):
+        if _INTENSIVAS_RE.search(culturas_txt):
             fator = 120  # Culturas intensivas
-        elif any(x in culturas_txt for x in ['café', 'algod', 'laranja']):
+        elif _SEMI_INTENSIVAS_RE.search(culturas_txt):
             fator = 200
         else:
             fator = 350  # Grãos mecanizados
@@ -211,12 +284,12 @@ def _heuristic_fill(dados: dict) -> tuple[dict, list[str]]:
         inferencias.append(f"Funcionários estimados: ~{est} (heurística {hectares}ha ÷ {fator})")
     
     # Capital operacional estimado
-    if dados.get('capital_social_estimado', 0) == 0 and hectares > 0:
+    if dados.get('capital_social_estimado', 0) == 0:
         # R$ por hectare depende da região e cultura
         regioes = str(dados.get('regioes_atuacao', '')).lower()
-        if any(x in regioes for x in ['mt', 'mato grosso', 'matopiba', 'ba', 'to', 'pi', 'ma']):
+        if _CERRADO_RE.search(regioes):
             valor_ha = 3500  # Cerrado valorizado
-        elif any(x in regioes for x in ['sp', 'são paulo', 'pr', 'paraná', 'rs']):
+        elif _SUL_SUDESTE_RE.search(regioes):
             valor_ha = 5000  # Sul/Sudeste
         else:
             valor_ha = 2500  # Conservador
@@ -226,7 +299,7 @@ def _heuristic_fill(dados: dict) -> tuple[dict, list[str]]:
         inferencias.append(f"Capital estimado: R${est/1e6:.1f}M (heurística {hectares}ha × R${valor_ha}/ha)")
     
     # Faturamento estimado (se não existir)
-    if dados.get('faturamento_estimado', 0) == 0 and hectares > 0:
+    if dados.get('faturamento_estimado', 0) == 0:
         # Estimativa conservadora: R$ 3k-8k por hectare de receita anual
         receita_ha = 5000
         est = hectares * receita_ha
@@ -240,6 +313,12 @@ def _heuristic_fill(dados: dict) -> tuple[dict, list[str]]:
 # CALCULADORA PRINCIPAL
 # =============================================================================
 
+# Faixas do dossiê sem dados numéricos (capital/área/funcionários zerados)
+_FAIXA_SEM_CAPITAL = _lookup_capital(0)
+_FAIXA_SEM_HECTARES = _lookup_hectares(0)
+_FAIXA_SEM_FUNCIONARIOS = _lookup_funcionarios(0)
+
+
 def calcular_sas(dados: dict) -> SASResult:
     """
     Calcula o Senior Agro Score 4.0.
@@ -252,43 +331,59 @@ def calcular_sas(dados: dict) -> SASResult:
     
     Total: max 1000 pts
     """
+    get = dados.get
+    # Caminho rápido do dossiê sem números (busca não trouxe área, capital nem
+    # funcionários): não há heurística a aplicar e as três faixas são fixas.
+    # Culturas, verticalização e governança ainda pontuam, então seguem normais.
+    if (not get('hectares_total', 0) > 0 and not get('funcionarios_estimados', 0) > 0
+            and not (get('capital_social_estimado', 0) or get('capital_social', 0))):
+        return _montar_sas(dados, [], _FAIXA_SEM_CAPITAL, _FAIXA_SEM_HECTARES, _FAIXA_SEM_FUNCIONARIOS)
+    
     # Preenche lacunas com heurísticas
     dados, inferencias = _heuristic_fill(dados)
+    get = dados.get
+    return _montar_sas(
+        dados, inferencias,
+        _lookup_capital(get('capital_social_estimado', 0) or get('capital_social', 0)),
+        _lookup_hectares(get('hectares_total', 0)),
+        _lookup_funcionarios(get('funcionarios_estimados', 0)),
+    )
+
+
+def _montar_sas(dados: dict, inferencias: list[str], capital: tuple[int, str],
+                hectares: tuple[int, str], funcionarios: tuple[int, str]) -> SASResult:
+    """Pilares de texto/flags + montagem do SASResult a partir das faixas numéricas já resolvidas."""
     justificativas = list(inferencias)
     
     # === PILAR 1: MÚSCULO (max 400) ===
-    cap_pts, cap_label = _lookup_capital(dados.get('capital_social_estimado', 0) or dados.get('capital_social', 0))
-    hec_pts, hec_label = _lookup_hectares(dados.get('hectares_total', 0))
-    musculo = min(cap_pts + hec_pts, 400)
+    cap_pts, cap_label = capital
+    hec_pts, hec_label = hectares
+    musculo = cap_pts + hec_pts
+    musculo = 400 if musculo > 400 else musculo
     justificativas.append(f"Músculo: {cap_label} ({cap_pts}) + {hec_label} ({hec_pts}) = {musculo}")
     
     # === PILAR 2: COMPLEXIDADE (max 250) ===
-    cult_pts, cult_label = _lookup_cultura(dados.get('culturas', []))
+    culturas = dados.get('culturas')
+    cult_pts, cult_label = _lookup_cultura(tuple(map(str, culturas)) if culturas else ())
     vert_pts, vert_label = _lookup_verticalizacao(dados.get('verticalizacao'))
-    complexidade = min(cult_pts + vert_pts, 250)
+    complexidade = cult_pts + vert_pts
+    complexidade = 250 if complexidade > 250 else complexidade
     justificativas.append(f"Complexidade: {cult_label} ({cult_pts}) + {vert_label} ({vert_pts}) = {complexidade}")
     
     # === PILAR 3: GENTE (max 200) ===
-    func_pts, func_label = _lookup_funcionarios(dados.get('funcionarios_estimados', 0))
-    gente = min(func_pts, 200)
+    func_pts, func_label = funcionarios
+    gente = 200 if func_pts > 200 else func_pts
     justificativas.append(f"Gente: {func_label} = {gente}")
     
     # === PILAR 4: MOMENTO (max 150) ===
     gov_pts, gov_label = _lookup_governanca(dados)
-    momento = min(gov_pts, 150)
+    momento = 150 if gov_pts > 150 else gov_pts
     justificativas.append(f"Momento: {gov_label} = {momento}")
     
     # === TOTAL ===
     total = musculo + complexidade + gente + momento
     
-    if total >= 751:
-        tier = Tier.DIAMANTE
-    elif total >= 501:
-        tier = Tier.OURO
-    elif total >= 251:
-        tier = Tier.PRATA
-    else:
-        tier = Tier.BRONZE
+    tier = _TIERS[bisect.bisect_right(_TIER_LIMITES, total)]
     
     return SASResult(
         score=total,
@@ -302,3 +397,53 @@ def calcular_sas(dados: dict) -> SASResult:
         dados_inferidos=len(inferencias) > 0,
         justificativas=justificativas,
     )
+
+
+# Abaixo disso o custo de montar os arrays supera o ganho do searchsorted
+_BATCH_MIN = 64
+
+if HAS_NUMPY:
+    _CAPITAL_LIMIARES_NP = np.array(_CAPITAL_LIMIARES, dtype=np.float64)
+    _HECTARES_LIMIARES_NP = np.array(_HECTARES_LIMIARES, dtype=np.float64)
+    _FUNCIONARIOS_LIMIARES_NP = np.array(_FUNCIONARIOS_LIMIARES, dtype=np.float64)
+
+
+def calcular_sas_batch(dados_list: list[dict]) -> list[SASResult]:
+    """
+    calcular_sas para muitos prospects de uma vez (varreduras/enriquecimento em lote).
+    As faixas de capital, hectares e funcionários saem de um np.searchsorted por
+    coluna; culturas, verticalização e governança (texto/flags) seguem por linha.
+    Resultado idêntico a [calcular_sas(d) for d in dados_list].
+    """
+    if not HAS_NUMPY or len(dados_list) < _BATCH_MIN:
+        return [calcular_sas(d) for d in dados_list]
+    
+    preenchidos = [_heuristic_fill(d) for d in dados_list]
+    n = len(preenchidos)
+    capital = np.fromiter(
+        (d.get('capital_social_estimado', 0) or d.get('capital_social', 0) for d, _ in preenchidos),
+        dtype=np.float64, count=n,
+    )
+    hectares = np.fromiter((d.get('hectares_total', 0) for d, _ in preenchidos), dtype=np.float64, count=n)
+    funcs = np.fromiter((d.get('funcionarios_estimados', 0) for d, _ in preenchidos), dtype=np.float64, count=n)
+    
+    i_cap = np.searchsorted(_CAPITAL_LIMIARES_NP, capital, side='right').tolist()
+    i_hec = np.searchsorted(_HECTARES_LIMIARES_NP, hectares, side='right').tolist()
+    i_func = np.searchsorted(_FUNCIONARIOS_LIMIARES_NP, funcs, side='right').tolist()
+    
+    resultados = []
+    for k, (dados, inferencias) in enumerate(preenchidos):
+        hec = dados.get('hectares_total', 0)
+        if hec > 0:
+            pts, porte = _HECTARES_FAIXAS[i_hec[k]]
+            faixa_hec = (pts, f"{hec:,} ha → {porte}")
+        else:
+            faixa_hec = (0, "Sem dados de área")
+        func = dados.get('funcionarios_estimados', 0)
+        if func > 0:
+            pts, porte = _FUNCIONARIOS_FAIXAS[i_func[k]]
+            faixa_func = (pts, f"{func} funcs → {porte}")
+        else:
+            faixa_func = (0, "Sem dados de funcionários")
+        resultados.append(_montar_sas(dados, inferencias, _CAPITAL_FAIXAS[i_cap[k]], faixa_hec, faixa_func))
+    return resultados
@@ -3,6 +3,10 @@ utils/market_intelligence.py — Base de Conhecimento Estática
 Equivalente ao marketIntelligence.ts.
 Alimenta os prompts da IA com contexto de domínio sem custo de API.
 """
+import re
+import sys
+from functools import lru_cache
+from types import MappingProxyType
 
 # =============================================================================
 # DORES POR CNAE / SETOR
@@ -191,36 +195,80 @@ ARGUMENTOS_CONCORRENCIA = {
 # HELPERS PARA ENRIQUECIMENTO DE PROMPTS
 # =============================================================================
 
+# Prefixos de 4 dígitos com dores mapeadas, num único match ancorado
+_CNAE_RE = re.compile("^(" + "|".join(k for k in DORES_POR_CNAE if k.isdigit()) + ")")
+
+
+@lru_cache(maxsize=1024)
 def get_contexto_cnae(cnae: str) -> dict:
-    """Retorna contexto de dores por CNAE (primeiros 4 dígitos)."""
-    cnae_4 = str(cnae)[:4] if cnae else ""
-    return DORES_POR_CNAE.get(cnae_4, DORES_POR_CNAE["generico_agro"])
+    """Retorna contexto de dores por CNAE (primeiros 4 dígitos; memorizado, não altere o dict)."""
+    m = _CNAE_RE.match(str(cnae)) if cnae else None
+    return DORES_POR_CNAE[m.group(1)] if m else DORES_POR_CNAE["generico_agro"]
 
 
+@lru_cache(maxsize=64)
 def get_contexto_regional(uf: str) -> dict:
-    """Retorna contexto regional por UF."""
+    """Retorna contexto regional por UF (memorizado; não altere o dict retornado)."""
     return CONTEXTO_REGIONAL.get(str(uf).upper(), {
         "nome": uf or "Não identificado",
         "perfil": "Sem perfil regional detalhado.",
         "desafios": "A ser investigado.",
-        "concorrentes_erp": [],
+        "concorrentes_erp": (),
     })
 
 
+def _bloco_setor(ctx_cnae: dict) -> str:
+    dores = "\n".join(f"  - {d}" for d in ctx_cnae['dores'])
+    return f"SETOR: {ctx_cnae['setor']}\nDORES TÍPICAS DO SETOR:\n{dores}\n"
+
+
+def _bloco_regiao(ctx_uf: dict) -> str:
+    return (
+        f"REGIÃO: {ctx_uf.get('nome', 'N/D')}\n"
+        f"PERFIL REGIONAL: {ctx_uf.get('perfil', 'N/D')}\n"
+        f"DESAFIOS REGIONAIS: {ctx_uf.get('desafios', 'N/D')}\n"
+        f"CONCORRENTES ERP NA REGIÃO: {', '.join(ctx_uf.get('concorrentes_erp', []))}\n"
+    )
+
+
+def _congelar(tabela: dict) -> dict:
+    """Listas internas viram tuplas (menores, compartilháveis) e as chaves são internadas."""
+    return {
+        sys.intern(k): {
+            campo: tuple(valor) if isinstance(valor, list) else valor
+            for campo, valor in v.items()
+        }
+        for k, v in tabela.items()
+    }
+
+
+DORES_POR_CNAE = _congelar(DORES_POR_CNAE)
+CONTEXTO_REGIONAL = _congelar(CONTEXTO_REGIONAL)
+ARGUMENTOS_CONCORRENCIA = _congelar(ARGUMENTOS_CONCORRENCIA)
+
+# Blocos de prompt já formatados (a base é estática): o enriquecimento só
+# concatena strings prontas
+_BLOCOS_SETOR = {k: _bloco_setor(v) for k, v in DORES_POR_CNAE.items()}
+_MODULOS_SETOR = {k: ', '.join(v.get('modulos_senior', [])) for k, v in DORES_POR_CNAE.items()}
+_BLOCOS_REGIAO = {k: _bloco_regiao(v) for k, v in CONTEXTO_REGIONAL.items()}
+
+# Base somente leitura daqui em diante (os blocos acima dependem dela)
+DORES_POR_CNAE = MappingProxyType(DORES_POR_CNAE)
+CONTEXTO_REGIONAL = MappingProxyType(CONTEXTO_REGIONAL)
+ARGUMENTOS_CONCORRENCIA = MappingProxyType(ARGUMENTOS_CONCORRENCIA)
+
+
+@lru_cache(maxsize=1024)
 def enriquecer_prompt_com_contexto(cnae: str = "", uf: str = "") -> str:
-    """Gera bloco de contexto para injetar no prompt da IA."""
-    ctx_cnae = get_contexto_cnae(cnae)
-    ctx_uf = get_contexto_regional(uf)
+    """Gera bloco de contexto para injetar no prompt da IA (memorizado por cnae/uf)."""
+    cnae_4 = str(cnae)[:4] if cnae else ""
+    if cnae_4 not in _BLOCOS_SETOR:
+        cnae_4 = "generico_agro"
+    bloco_regiao = _BLOCOS_REGIAO.get(str(uf).upper()) or _bloco_regiao(get_contexto_regional(uf))
     
-    return f"""
-=== INTELIGÊNCIA DE MERCADO (Base de Conhecimento Senior) ===
-SETOR: {ctx_cnae['setor']}
-DORES TÍPICAS DO SETOR:
-{chr(10).join(f'  - {d}' for d in ctx_cnae['dores'])}
-
-REGIÃO: {ctx_uf.get('nome', 'N/D')}
-PERFIL REGIONAL: {ctx_uf.get('perfil', 'N/D')}
-DESAFIOS REGIONAIS: {ctx_uf.get('desafios', 'N/D')}
-CONCORRENTES ERP NA REGIÃO: {', '.join(ctx_uf.get('concorrentes_erp', []))}
-MÓDULOS SENIOR RECOMENDADOS: {', '.join(ctx_cnae.get('modulos_senior', []))}
-"""
+    return (
+        "\n=== INTELIGÊNCIA DE MERCADO (Base de Conhecimento Senior) ===\n"
+        f"{_BLOCOS_SETOR[cnae_4]}\n"
+        f"{bloco_regiao}"
+        f"MÓDULOS SENIOR RECOMENDADOS: {_MODULOS_SETOR[cnae_4]}\n"
+    )
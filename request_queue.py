@@ -3,9 +3,12 @@ services/request_queue.py — Leão de Chácara da API
 Equivalente ao requestQueueService.ts.
 Token Bucket com filas de prioridade para controlar rate limit do Gemini.
 """
+import heapq
+import itertools
+import math
 import time
 import threading
-from typing import Callable, Any
+from typing import Callable, Any, Optional
 from enum import IntEnum
 from dataclasses import dataclass, field
 
@@ -17,102 +20,215 @@ class Priority(IntEnum):
     LOW = 3         # Enriquecimento em background
 
 
-@dataclass
+# RPM por modelo (free tier do Gemini menos 1 de folga). Modelos fora da
+# tabela usam o rpm_limit padrão da fila.
+RPM_POR_MODELO = {
+    "gemini-2.5-pro": 4,
+    "gemini-2.5-flash": 9,
+    "gemini-2.5-flash-lite": 14,
+}
+
+
+_MILI = 1000  # unidades por token
+
+
+@dataclass(slots=True)
 class RateLimiter:
-    """Token Bucket simples para controle de rate limit."""
+    """
+    Token Bucket com fila de espera por prioridade.
+    Quem espera entra num heap (prioridade, ordem de chegada) e só o primeiro
+    da fila pode consumir o próximo token: CRITICAL fura a fila de NORMAL.
+    """
     
     max_tokens: int = 14           # Requisições por minuto (Gemini free tier = 15 RPM)
     refill_interval: float = 60.0  # Segundos para refill completo
     
-    _tokens: float = field(init=False)
-    _last_refill: float = field(init=False)
+    # Contabilidade inteira em milésimos de token sobre relógio monotônico:
+    # sem deriva de float e imune a saltos do relógio de parede (NTP)
+    _tokens_m: int = field(init=False)
+    _resto: int = field(init=False, default=0)
+    _last_refill_ns: int = field(init=False)
+    _intervalo_ns: int = field(init=False)
     _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    _cond: threading.Condition = field(init=False)
+    _fila: list = field(init=False, default_factory=list)
+    _seq: itertools.count = field(init=False, default_factory=itertools.count)
     
     def __post_init__(self):
-        self._tokens = float(self.max_tokens)
-        self._last_refill = time.time()
+        self._tokens_m = self.max_tokens * _MILI
+        self._last_refill_ns = time.monotonic_ns()
+        self._intervalo_ns = int(self.refill_interval * 1_000_000_000)
+        self._cond = threading.Condition(self._lock)
     
     def _refill(self):
-        now = time.time()
-        elapsed = now - self._last_refill
-        tokens_to_add = elapsed * (self.max_tokens / self.refill_interval)
-        self._tokens = min(self.max_tokens, self._tokens + tokens_to_add)
-        self._last_refill = now
+        now = time.monotonic_ns()
+        # O resto da divisão fica guardado: refills frequentes não perdem frações
+        adicionar, self._resto = divmod(
+            (now - self._last_refill_ns) * self.max_tokens * _MILI + self._resto,
+            self._intervalo_ns,
+        )
+        self._last_refill_ns = now
+        cheio = self.max_tokens * _MILI
+        if self._tokens_m + adicionar >= cheio:
+            self._tokens_m = cheio
+            self._resto = 0
+        else:
+            self._tokens_m += adicionar
+    
+    def _entrar(self, priority: Priority) -> tuple:
+        """Com o lock: coloca um ticket na fila de espera."""
+        ticket = (int(priority), next(self._seq))
+        heapq.heappush(self._fila, ticket)
+        return ticket
     
-    def acquire(self, timeout: float = 120.0) -> bool:
+    def _sair(self, ticket: tuple):
+        """Com o lock: retira um ticket que desistiu (timeout/cancelamento)."""
+        if ticket in self._fila:
+            self._fila.remove(ticket)
+            heapq.heapify(self._fila)
+            self._cond.notify_all()
+    
+    def _pegar_livre(self) -> bool:
+        """Com o lock: caminho rápido — fila vazia e token disponível, sem ticket."""
+        if self._fila:
+            return False
+        self._refill()
+        if self._tokens_m >= _MILI:
+            self._tokens_m -= _MILI
+            return True
+        return False
+    
+    def _tentar(self, ticket: tuple) -> Optional[float]:
+        """
+        Com o lock: consome um token se o ticket é o primeiro da fila.
+        Retorna None se conseguiu, senão quantos segundos esperar: o déficit
+        exato até o próximo token, ou infinito se não é a vez deste ticket
+        (quem está na frente notifica ao pegar o token ou desistir).
+        """
+        if self._fila[0] != ticket:
+            return math.inf
+        self._refill()
+        if self._tokens_m >= _MILI:
+            heapq.heappop(self._fila)
+            self._tokens_m -= _MILI
+            self._cond.notify_all()  # o próximo da fila reavalia
+            return None
+        return (_MILI - self._tokens_m) * self.refill_interval / (self.max_tokens * _MILI)
+    
+    def acquire(self, timeout: float = 120.0, priority: Priority = Priority.NORMAL) -> bool:
         """Tenta adquirir um token. Bloqueia até conseguir ou timeout."""
-        deadline = time.time() + timeout
+        deadline = time.monotonic() + timeout
         
-        while time.time() < deadline:
-            with self._lock:
-                self._refill()
-                if self._tokens >= 1.0:
-                    self._tokens -= 1.0
+        with self._cond:
+            if self._pegar_livre():
+                return True
+            ticket = self._entrar(priority)
+            while True:
+                espera = self._tentar(ticket)
+                if espera is None:
                     return True
-            
-            # Espera antes de tentar novamente
-            wait_time = min(self.refill_interval / self.max_tokens, deadline - time.time())
-            if wait_time > 0:
-                time.sleep(wait_time)
-        
-        return False
+                restante = deadline - time.monotonic()
+                if restante <= 0:
+                    self._sair(ticket)
+                    return False
+                self._cond.wait(min(espera, restante))
     
     @property
     def available_tokens(self) -> float:
         with self._lock:
             self._refill()
-            return self._tokens
+            return self._tokens_m / _MILI
+    
+    @property
+    def waiting(self) -> dict[str, int]:
+        """Quantos aguardam token, por prioridade (só as que têm alguém)."""
+        with self._lock:
+            contagem: dict[str, int] = {}
+            for prioridade, _ in self._fila:
+                nome = Priority(prioridade).name
+                contagem[nome] = contagem.get(nome, 0) + 1
+            return contagem
 
 
 class RequestQueue:
-    """Fila de requisições com rate limiting e prioridade."""
+    """Fila de requisições com rate limiting por modelo e prioridade."""
     
-    def __init__(self, rpm_limit: int = 14):
-        self._limiter = RateLimiter(max_tokens=rpm_limit)
+    def __init__(self, rpm_limit: int = 14, rpm_por_modelo: Optional[dict[str, int]] = None):
+        self._rpm_limit = rpm_limit
+        self._rpm_por_modelo = dict(rpm_por_modelo or {})
+        self._limiters: dict[Optional[str], RateLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        # Contadores lidos e escritos por várias threads: `+=` não é atômico
+        self._stats_lock = threading.Lock()
         self._total_requests = 0
         self._total_wait_time = 0.0
         self._errors = 0
     
+    def _limiter(self, model: Optional[str]) -> RateLimiter:
+        """Um token bucket por modelo (criado na primeira chamada)."""
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            with self._limiters_lock:
+                limiter = self._limiters.get(model)
+                if limiter is None:
+                    rpm = self._rpm_por_modelo.get(model, self._rpm_limit)
+                    limiter = self._limiters[model] = RateLimiter(max_tokens=rpm)
+        return limiter
+    
     def execute(
         self,
         fn: Callable[..., Any],
         *args,
         priority: Priority = Priority.NORMAL,
+        model: Optional[str] = None,
         timeout: float = 120.0,
         **kwargs,
     ) -> Any:
         """
-        Executa uma função respeitando o rate limit.
-        Bloqueia até ter token disponível.
+        Executa uma função respeitando o rate limit do modelo.
+        Bloqueia até ter token disponível, atendendo antes as prioridades maiores.
         """
         start = time.time()
         
-        if not self._limiter.acquire(timeout=timeout):
-            self._errors += 1
+        if not self._limiter(model).acquire(timeout=timeout, priority=priority):
+            with self._stats_lock:
+                self._errors += 1
             raise TimeoutError(f"Rate limit: timeout após {timeout}s esperando por token")
         
         wait_time = time.time() - start
-        self._total_wait_time += wait_time
-        self._total_requests += 1
+        with self._stats_lock:
+            self._total_wait_time += wait_time
+            self._total_requests += 1
         
         try:
             return fn(*args, **kwargs)
         except Exception as e:
-            self._errors += 1
+            with self._stats_lock:
+                self._errors += 1
             raise
     
     @property
     def stats(self) -> dict:
+        with self._stats_lock:
+            total, erros, espera = self._total_requests, self._errors, self._total_wait_time
         return {
-            "total_requests": self._total_requests,
-            "total_errors": self._errors,
+            "total_requests": total,
+            "total_errors": erros,
             "avg_wait_seconds": (
-                f"{self._total_wait_time / self._total_requests:.2f}"
-                if self._total_requests > 0 else "0"
+                f"{espera / total:.2f}"
+                if total > 0 else "0"
             ),
-            "available_tokens": f"{self._limiter.available_tokens:.1f}",
+            "available_tokens": {
+                model or "padrão": f"{limiter.available_tokens:.1f}"
+                for model, limiter in list(self._limiters.items())
+            },
+            "waiting": {
+                model or "padrão": espera
+                for model, limiter in list(self._limiters.items())
+                if (espera := limiter.waiting)
+            },
         }
 
 
 # Singleton global  
-request_queue = RequestQueue(rpm_limit=14)
+request_queue = RequestQueue(rpm_limit=14, rpm_por_modelo=RPM_POR_MODELO)
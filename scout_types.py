@@ -44,8 +44,32 @@ class ModelTier(str, Enum):
 # DATA CLASSES — Dados da Empresa
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
+class QSAColumns:
+    """Quadro societário em colunas paralelas (uma lista por campo, um índice por sócio)."""
+    nome: list[str] = field(default_factory=list)
+    qualificacao: list[str] = field(default_factory=list)
+    data_entrada: list[str] = field(default_factory=list)
+    cpf_cnpj: list[str] = field(default_factory=list)
+    faixa_etaria: list[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.nome)
+
+    def to_dict(self) -> dict[str, list[str]]:
+        """Colunas por nome (sem cópia), prontas para pd.DataFrame."""
+        return {
+            "nome": self.nome,
+            "qualificacao": self.qualificacao,
+            "data_entrada": self.data_entrada,
+            "cpf_cnpj": self.cpf_cnpj,
+            "faixa_etaria": self.faixa_etaria,
+        }
+
+
+@dataclass(slots=True, frozen=True)
 class DadosCNPJ:
+    # Imutável e sem __dict__: instâncias vão para cache e lotes de CNPJs
     cnpj: str = ""
     razao_social: str = ""
     nome_fantasia: str = ""
@@ -56,7 +80,7 @@ class DadosCNPJ:
     porte: str = ""
     cnae_principal: str = ""
     cnae_descricao: str = ""
-    cnaes_secundarios: list[str] = field(default_factory=list)
+    cnaes_secundarios: tuple[str, ...] = ()
     municipio: str = ""
     uf: str = ""
     cep: str = ""
@@ -66,51 +90,99 @@ class DadosCNPJ:
     bairro: str = ""
     telefone: str = ""
     email: str = ""
-    qsa: list[dict] = field(default_factory=list)
+    qsa: QSAColumns = field(default_factory=QSAColumns)
     # Metadados
     fonte: str = "brasilapi"
-    timestamp: str = ""
+    timestamp: int = 0  # epoch em segundos
+
+
+# Objeto nulo do DossieCompleto sem CNPJ: compare por identidade
+# (`dados_cnpj is not EMPTY_CNPJ`) em vez de checar None
+EMPTY_CNPJ = DadosCNPJ()
 
 
-@dataclass
 class Verticalizacao:
-    agroindustria: bool = False
-    sementeira: bool = False
-    silos: bool = False
-    algodoeira: bool = False
-    usina: bool = False
-    frigorifico: bool = False
-    fabrica_racao: bool = False
+    """
+    Flags de verticalização empacotadas num único int (bit i = BIT_NAMES[i]).
+    Construção, leitura e escrita por nome seguem como no antigo dataclass;
+    `bits` serve de índice direto para tabelas pré-computadas.
+    """
+    __slots__ = ("bits",)
+    BIT_NAMES = (
+        "agroindustria", "sementeira", "silos", "algodoeira",
+        "usina", "frigorifico", "fabrica_racao",
+    )
+    
+    def __init__(self, agroindustria: bool = False, sementeira: bool = False,
+                 silos: bool = False, algodoeira: bool = False, usina: bool = False,
+                 frigorifico: bool = False, fabrica_racao: bool = False, *, bits: int = 0):
+        self.bits = bits | (
+            bool(agroindustria) | bool(sementeira) << 1 | bool(silos) << 2
+            | bool(algodoeira) << 3 | bool(usina) << 4 | bool(frigorifico) << 5
+            | bool(fabrica_racao) << 6
+        )
+    
+    def as_dict(self) -> dict[str, bool]:
+        """Flags por nome (formato do JSON dos agentes e dos prompts)."""
+        return {nome: bool(self.bits >> i & 1) for i, nome in enumerate(self.BIT_NAMES)}
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.bits == other.bits
+    
+    __hash__ = None  # mutável, como o dataclass que substitui
+    
+    def __repr__(self) -> str:
+        campos = ", ".join(f"{k}={v}" for k, v in self.as_dict().items())
+        return f"Verticalizacao({campos})"
+
+
+def _flag_verticalizacao(i: int) -> property:
+    mascara = 1 << i
+    
+    def ler(self) -> bool:
+        return bool(self.bits & mascara)
+    
+    def gravar(self, valor: bool) -> None:
+        self.bits = self.bits | mascara if valor else self.bits & ~mascara
+    
+    return property(ler, gravar)
+
+
+for _i, _nome in enumerate(Verticalizacao.BIT_NAMES):
+    setattr(Verticalizacao, _nome, _flag_verticalizacao(_i))
+del _i, _nome
 
 
-@dataclass
+@dataclass(slots=True)
 class DadosOperacionais:
     nome_grupo: str = ""
     hectares_total: int = 0
-    culturas: list[str] = field(default_factory=list)
+    culturas: tuple[str, ...] = ()
     verticalizacao: Verticalizacao = field(default_factory=Verticalizacao)
-    regioes_atuacao: list[str] = field(default_factory=list)
+    regioes_atuacao: tuple[str, ...] = ()
     numero_fazendas: int = 0
-    tecnologias_identificadas: list[str] = field(default_factory=list)
+    tecnologias_identificadas: tuple[str, ...] = ()
     confianca: float = 0.0  # 0-1, quão confiável é a informação
 
 
-@dataclass
+@dataclass(slots=True)
 class DadosFinanceiros:
     capital_social_estimado: float = 0.0
     funcionarios_estimados: int = 0
     faturamento_estimado: float = 0.0
-    movimentos_financeiros: list[str] = field(default_factory=list)
-    fiagros_relacionados: list[str] = field(default_factory=list)
-    cras_emitidos: list[str] = field(default_factory=list)
-    parceiros_financeiros: list[str] = field(default_factory=list)
-    auditorias: list[str] = field(default_factory=list)
+    movimentos_financeiros: tuple[str, ...] = ()
+    fiagros_relacionados: tuple[str, ...] = ()
+    cras_emitidos: tuple[str, ...] = ()
+    parceiros_financeiros: tuple[str, ...] = ()
+    auditorias: tuple[str, ...] = ()
     governanca_corporativa: bool = False
     resumo_financeiro: str = ""
     confianca: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class IntelMercado:
     noticias_recentes: list[dict] = field(default_factory=list)
     concorrentes: list[str] = field(default_factory=list)
@@ -126,16 +198,17 @@ class IntelMercado:
 # DATA CLASSES — Score e Análise
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SASBreakdown:
+    # Imutável: o total é somado uma vez na criação, não a cada leitura
     musculo: int = 0          # max 400
     complexidade: int = 0     # max 250
     gente: int = 0            # max 200
     momento: int = 0          # max 150
+    total: int = field(init=False, repr=False, compare=False)
 
-    @property
-    def total(self) -> int:
-        return self.musculo + self.complexidade + self.gente + self.momento
+    def __post_init__(self):
+        object.__setattr__(self, "total", self.musculo + self.complexidade + self.gente + self.momento)
 
     def to_dict(self) -> dict:
         return {
@@ -146,16 +219,20 @@ class SASBreakdown:
         }
 
 
-@dataclass
+# Breakdown zerado compartilhado (frozen) pelos SASResult ainda não calculados
+EMPTY_BREAKDOWN = SASBreakdown()
+
+
+@dataclass(slots=True)
 class SASResult:
     score: int = 0
     tier: Tier = Tier.BRONZE
-    breakdown: SASBreakdown = field(default_factory=SASBreakdown)
+    breakdown: SASBreakdown = EMPTY_BREAKDOWN  # imutável: compartilhado entre os vazios
     dados_inferidos: bool = False
     justificativas: list[str] = field(default_factory=list)
 
 
-@dataclass 
+@dataclass(slots=True)
 class QualityCheck:
     criterio: str = ""
     passou: bool = False
@@ -163,7 +240,7 @@ class QualityCheck:
     peso: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class QualityReport:
     nivel: QualityLevel = QualityLevel.INSUFICIENTE
     score_qualidade: float = 0.0
@@ -176,21 +253,22 @@ class QualityReport:
 # DATA CLASSES — Dossiê Completo
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SecaoAnalise:
+    # Imutável: criada uma vez por seção em _parse_secoes e só lida depois
     titulo: str = ""
     conteudo: str = ""
     icone: str = "📄"
 
 
-@dataclass
+@dataclass(slots=True)
 class DossieCompleto:
     # Identificação
     empresa_alvo: str = ""
     cnpj: str = ""
     
     # Dados coletados
-    dados_cnpj: Optional[DadosCNPJ] = None
+    dados_cnpj: DadosCNPJ = EMPTY_CNPJ
     dados_operacionais: DadosOperacionais = field(default_factory=DadosOperacionais)
     dados_financeiros: DadosFinanceiros = field(default_factory=DadosFinanceiros)
     intel_mercado: IntelMercado = field(default_factory=IntelMercado)
@@ -214,32 +292,37 @@ class DossieCompleto:
     
     def merge_dados(self) -> dict:
         """Funde todos os dados em um dict plano para o score calculator."""
+        # Um campo por linha de propósito: mais rápido que um loop sobre uma tabela de campos
         merged = {}
+        # Sub-registros em locais: uma busca de atributo por campo, não duas
+        cnpj = self.dados_cnpj
+        op = self.dados_operacionais
+        fin = self.dados_financeiros
         
-        if self.dados_cnpj:
-            merged['capital_social'] = self.dados_cnpj.capital_social
-            merged['cnae_principal'] = self.dados_cnpj.cnae_principal
-            merged['cnae_descricao'] = self.dados_cnpj.cnae_descricao
-            merged['uf'] = self.dados_cnpj.uf
-            merged['municipio'] = self.dados_cnpj.municipio
-            merged['natureza_juridica'] = self.dados_cnpj.natureza_juridica
-            merged['qsa_count'] = len(self.dados_cnpj.qsa)
+        if cnpj is not EMPTY_CNPJ:
+            merged['capital_social'] = cnpj.capital_social
+            merged['cnae_principal'] = cnpj.cnae_principal
+            merged['cnae_descricao'] = cnpj.cnae_descricao
+            merged['uf'] = cnpj.uf
+            merged['municipio'] = cnpj.municipio
+            merged['natureza_juridica'] = cnpj.natureza_juridica
+            merged['qsa_count'] = len(cnpj.qsa)
         
-        merged['nome_grupo'] = self.dados_operacionais.nome_grupo or self.empresa_alvo
-        merged['hectares_total'] = self.dados_operacionais.hectares_total
-        merged['culturas'] = self.dados_operacionais.culturas
-        merged['verticalizacao'] = self.dados_operacionais.verticalizacao
-        merged['regioes_atuacao'] = self.dados_operacionais.regioes_atuacao
-        merged['numero_fazendas'] = self.dados_operacionais.numero_fazendas
-        merged['tecnologias'] = self.dados_operacionais.tecnologias_identificadas
+        merged['nome_grupo'] = op.nome_grupo or self.empresa_alvo
+        merged['hectares_total'] = op.hectares_total
+        merged['culturas'] = op.culturas
+        merged['verticalizacao'] = op.verticalizacao
+        merged['regioes_atuacao'] = op.regioes_atuacao
+        merged['numero_fazendas'] = op.numero_fazendas
+        merged['tecnologias'] = op.tecnologias_identificadas
         
-        merged['capital_social_estimado'] = self.dados_financeiros.capital_social_estimado
-        merged['funcionarios_estimados'] = self.dados_financeiros.funcionarios_estimados
-        merged['faturamento_estimado'] = self.dados_financeiros.faturamento_estimado
-        merged['movimentos_financeiros'] = self.dados_financeiros.movimentos_financeiros
-        merged['fiagros'] = self.dados_financeiros.fiagros_relacionados
-        merged['cras'] = self.dados_financeiros.cras_emitidos
-        merged['governanca'] = self.dados_financeiros.governanca_corporativa
-        merged['parceiros_financeiros'] = self.dados_financeiros.parceiros_financeiros
+        merged['capital_social_estimado'] = fin.capital_social_estimado
+        merged['funcionarios_estimados'] = fin.funcionarios_estimados
+        merged['faturamento_estimado'] = fin.faturamento_estimado
+        merged['movimentos_financeiros'] = fin.movimentos_financeiros
+        merged['fiagros'] = fin.fiagros_relacionados
+        merged['cras'] = fin.cras_emitidos
+        merged['governanca'] = fin.governanca_corporativa
+        merged['parceiros_financeiros'] = fin.parceiros_financeiros
         
         return merged
@@ -0,0 +1,29 @@
+"""Extração de JSON das respostas do Gemini (services/gemini_service.py)."""
+import pytest
+
+pytest.importorskip("google.genai")
+from services.gemini_service import _clean_json, _clean_json_array  # noqa: E402
+
+
+def test_virgula_sobrando_nao_devolve_objeto_aninhado():
+    texto = ('Aqui: {"nome_grupo": "X", "verticalizacao": {"agroindustria": true}, '
+             '"confianca": 0.8,}')
+    assert _clean_json(texto) is None
+
+
+def test_prosa_com_chaves_antes_do_json():
+    texto = ('Use o formato {chave: valor}. Resposta:\n'
+             '{"nome_grupo": "X", "verticalizacao": {"agroindustria": true}}')
+    assert _clean_json(texto) == {"nome_grupo": "X", "verticalizacao": {"agroindustria": True}}
+
+
+def test_abertura_solta_antes_do_json():
+    assert _clean_json('Texto { solto e depois {"a": {"b": 1}}') == {"a": {"b": 1}}
+
+
+def test_chaves_dentro_de_string():
+    assert _clean_json('```json\n{"a": "}{"}\n```') == {"a": "}{"}
+
+
+def test_array():
+    assert _clean_json_array("lista: [1, [2, 3]] fim") == [1, [2, 3]]
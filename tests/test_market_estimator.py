@@ -0,0 +1,68 @@
+"""SAS em lote (services/market_estimator.py)."""
+import copy
+import itertools
+
+import pytest
+
+pytest.importorskip("numpy")
+from services.market_estimator import (  # noqa: E402
+    _BATCH_MIN,
+    _CAPITAL_LIMIARES,
+    _FUNCIONARIOS_LIMIARES,
+    _HECTARES_LIMIARES,
+    calcular_sas,
+    calcular_sas_batch,
+)
+from scout_types import Verticalizacao  # noqa: E402
+
+
+def _em_volta(limiares):
+    # Cada limiar e seus vizinhos, mais zero, negativos e fração abaixo do primeiro
+    valores = {0, -1, -250, 0.5}
+    for t in limiares:
+        valores.update((t - 1, t, t + 1))
+    return sorted(valores)
+
+
+def _prospects():
+    linhas = []
+    for cap in _em_volta(_CAPITAL_LIMIARES):
+        linhas.append({"capital_social_estimado": cap})
+        linhas.append({"capital_social": cap})  # fallback quando falta o estimado
+    for hec in _em_volta(_HECTARES_LIMIARES):
+        # Capital e funcionários zerados: entram pelo _heuristic_fill
+        linhas.append({"hectares_total": hec, "culturas": ["Soja", "Milho"],
+                       "regioes_atuacao": ["MT"]})
+        linhas.append({"hectares_total": hec, "culturas": ["Cana"],
+                       "regioes_atuacao": ["São Paulo"], "faturamento_estimado": 1})
+    for func in _em_volta(_FUNCIONARIOS_LIMIARES):
+        linhas.append({"funcionarios_estimados": func, "hectares_total": 2_000,
+                       "capital_social_estimado": 3_000_000})
+    for cap, hec, func in itertools.product((0, 1_000_000), (0, 3_000), (0, 100)):
+        linhas.append({
+            "capital_social_estimado": cap, "hectares_total": hec, "funcionarios_estimados": func,
+            "culturas": ["Café", "Algodão"], "verticalizacao": Verticalizacao(silos=True, usina=True),
+            "movimentos_financeiros": ["Emissão de CRA"],
+        })
+    linhas.append({})
+    return linhas
+
+
+def test_lote_identico_ao_calculo_por_linha():
+    prospects = _prospects()
+    assert len(prospects) >= _BATCH_MIN  # passa pelo caminho do searchsorted
+
+    # _heuristic_fill preenche o dict recebido: cada caminho usa sua cópia
+    esperado = [calcular_sas(d) for d in copy.deepcopy(prospects)]
+    obtido = calcular_sas_batch(copy.deepcopy(prospects))
+
+    assert len(obtido) == len(esperado)
+    for dados, a, b in zip(prospects, obtido, esperado):
+        assert a == b, dados
+
+
+def test_lote_pequeno_usa_o_calculo_por_linha():
+    prospects = _prospects()[:3]
+    assert calcular_sas_batch(copy.deepcopy(prospects)) == [
+        calcular_sas(d) for d in copy.deepcopy(prospects)
+    ]
@@ -0,0 +1,156 @@
+"""Token bucket com fila de prioridade (services/request_queue.py)."""
+import threading
+import time
+
+import pytest
+
+from services.request_queue import Priority, RateLimiter, RequestQueue, RPM_POR_MODELO
+
+
+class _Relogio:
+    """Relógio monotônico falso: só anda quando o teste manda."""
+
+    def __init__(self):
+        self.ns = 1_000_000_000
+
+    def monotonic_ns(self):
+        return self.ns
+
+    def monotonic(self):
+        return self.ns / 1e9
+
+    def avancar(self, segundos):
+        self.ns += int(segundos * 1_000_000_000)
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    r = _Relogio()
+    monkeypatch.setattr(time, "monotonic_ns", r.monotonic_ns)
+    monkeypatch.setattr(time, "monotonic", r.monotonic)
+    return r
+
+
+def _esperar(cond, timeout=2.0):
+    # Espera real (time.sleep não é afetado pelo relógio falso)
+    fim = time.perf_counter() + timeout
+    while not cond():
+        assert time.perf_counter() < fim, "condição não atingida"
+        time.sleep(0.005)
+
+
+def _acordar(limiter):
+    # O relógio falso não notifica ninguém: acorda os waiters para reavaliarem
+    with limiter._cond:
+        limiter._cond.notify_all()
+
+
+def _disparar(limiter, resultados, nome, **kwargs):
+    def alvo():
+        resultados.append((nome, limiter.acquire(**kwargs)))
+    t = threading.Thread(target=alvo, daemon=True)
+    t.start()
+    return t
+
+
+def test_critical_fura_a_fila_de_normal(relogio):
+    limiter = RateLimiter(max_tokens=1, refill_interval=60.0)
+    assert limiter.acquire(timeout=0)
+    resultados = []
+
+    normal = _disparar(limiter, resultados, "normal", timeout=1000, priority=Priority.NORMAL)
+    _esperar(lambda: limiter.waiting == {"NORMAL": 1})
+    critico = _disparar(limiter, resultados, "critico", timeout=1000, priority=Priority.CRITICAL)
+    _esperar(lambda: limiter.waiting == {"NORMAL": 1, "CRITICAL": 1})
+
+    relogio.avancar(60)  # exatamente um token
+    _acordar(limiter)
+    critico.join(2)
+    assert resultados == [("critico", True)]
+    assert limiter.waiting == {"NORMAL": 1}
+
+    relogio.avancar(60)
+    _acordar(limiter)
+    normal.join(2)
+    assert resultados == [("critico", True), ("normal", True)]
+
+
+def test_timeout_retira_ticket_e_acorda_o_proximo(relogio):
+    # refill_interval curto: as esperas reais do primeiro da fila ficam em ms
+    limiter = RateLimiter(max_tokens=1, refill_interval=0.2)
+    assert limiter.acquire(timeout=0)
+    resultados = []
+
+    primeiro = _disparar(limiter, resultados, "primeiro", timeout=0.1)
+    _esperar(lambda: limiter.waiting == {"NORMAL": 1})
+    # Fora da frente da fila o segundo espera sem prazo até alguém notificar
+    segundo = _disparar(limiter, resultados, "segundo", timeout=1000)
+    _esperar(lambda: limiter.waiting == {"NORMAL": 2})
+
+    relogio.avancar(0.15)  # passa o prazo do primeiro, ainda sem token
+    primeiro.join(2)
+    assert resultados == [("primeiro", False)]
+    assert limiter.waiting == {"NORMAL": 1}
+
+    # Sem _acordar: o segundo só pega o token se virou o primeiro da fila
+    relogio.avancar(0.1)
+    segundo.join(2)
+    assert resultados == [("primeiro", False), ("segundo", True)]
+    assert limiter.waiting == {}
+
+
+def test_refill_sem_deriva_fracionaria(relogio):
+    limiter = RateLimiter(max_tokens=7, refill_interval=60.0)
+    for _ in range(7):
+        assert limiter.acquire(timeout=0)
+    assert limiter.available_tokens == 0
+
+    passo_ns = 1_234_567
+    for _ in range(10_000):
+        relogio.ns += passo_ns
+        limiter.available_tokens  # força um _refill a cada passo
+
+    # Mesmo resultado de um único refill no intervalo inteiro
+    decorrido_ns = 10_000 * passo_ns
+    esperado_m = decorrido_ns * 7 * 1000 // 60_000_000_000
+    assert limiter.available_tokens == esperado_m / 1000
+
+
+def test_um_bucket_por_modelo(relogio):
+    fila = RequestQueue(rpm_limit=14, rpm_por_modelo=RPM_POR_MODELO)
+    assert fila._limiter("gemini-2.5-pro").max_tokens == RPM_POR_MODELO["gemini-2.5-pro"]
+    assert fila._limiter("gemini-2.5-flash").max_tokens == RPM_POR_MODELO["gemini-2.5-flash"]
+    assert fila._limiter("outro-modelo").max_tokens == 14
+    assert fila._limiter("gemini-2.5-pro") is fila._limiter("gemini-2.5-pro")
+
+    for _ in range(RPM_POR_MODELO["gemini-2.5-pro"]):
+        assert fila.execute(lambda: "ok", model="gemini-2.5-pro", timeout=0) == "ok"
+    with pytest.raises(TimeoutError):
+        fila.execute(lambda: "ok", model="gemini-2.5-pro", timeout=0)
+
+    # O Pro esgotado não consome o balde do Flash
+    assert fila.execute(lambda: "ok", model="gemini-2.5-flash", timeout=0) == "ok"
+
+
+def test_stats_contam_exato_com_varias_threads():
+    fila = RequestQueue(rpm_limit=100_000)
+
+    def falha():
+        raise ValueError("erro do agente")
+
+    def trabalhar():
+        for i in range(500):
+            try:
+                fila.execute(falha if i % 5 == 0 else (lambda: None))
+            except ValueError:
+                pass
+
+    threads = [threading.Thread(target=trabalhar) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = fila.stats
+    assert stats["total_requests"] == 8 * 500
+    assert stats["total_errors"] == 8 * 100